@@ -0,0 +1,152 @@
+# batch.py
+"""
+複数の工程表をまとめて生成するバッチ処理（GUIなし）。
+
+使い方:
+    python batch.py jobs.csv --workers 4 --output-dir output --report report.json
+
+ジョブ一覧はCSV（ヘッダー: title,start,end,factory）またはJSON（同じキーを持つオブジェクトのリスト）。
+start/endは 'YYYY/MM' 形式、factoryは工場名（'結城'など）または休日データの識別子（'kihon'など）。
+生成したファイルは開かず、ジョブごとの成否と所要時間を出力する。
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from data.excel_generator import ExcelGenerator
+from data.factories import FACTORIES_MAPPING
+from data.workbook_cache import WorkbookCache
+from data.year_month import index_date, parse_month
+from utils.path_helper import get_output_path
+
+
+def load_jobs(path):
+    """ジョブ一覧（CSVまたはJSON）を読み込む"""
+    if path.lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def parse_year_month(text):
+    """'YYYY/MM' または 'YYYY-MM' を月初のdatetimeに変換"""
+    return index_date(parse_month(str(text).strip().replace('-', '/')))
+
+
+def resolve_factory(factory):
+    """工場名を休日データの識別子に変換（識別子が指定された場合はそのまま）"""
+    factory = str(factory).strip()
+    return FACTORIES_MAPPING.get(factory, factory)
+
+
+def prepare_job(job, output_dir):
+    """ジョブの入力を検証し、生成に必要な引数を返す"""
+    title = str(job.get('title', '')).strip()
+    if not title:
+        raise ValueError("工事名(title)が指定されていません。")
+    start_date = parse_year_month(job['start'])
+    end_date = parse_year_month(job['end'])
+    if start_date > end_date:
+        raise ValueError("開始年月が終了年月より後になっています。")
+    factory = resolve_factory(job['factory'])
+    output_path = get_output_path(title, start_date, end_date, output_dir)
+    return title, start_date, end_date, factory, output_path
+
+
+def run_job(args, sparse=False, compress_level=None, cache_dir=None):
+    """1件の工程表を生成（ワーカープロセスで実行）"""
+    title, start_date, end_date, factory, output_path = args
+    started = time.perf_counter()
+    try:
+        cache = WorkbookCache(cache_dir) if cache_dir else None
+        generator = ExcelGenerator(open_file=False, sparse=sparse, compress_level=compress_level, cache=cache)
+        generator.generate_excel(title, start_date, end_date, factory, output_path)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {
+        'title': title,
+        'factory': factory,
+        'output_path': output_path,
+        'ok': error is None,
+        'error': error,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def run_batch(jobs, output_dir='output', workers=None, sparse=False, compress_level=None, cache_dir=None):
+    """
+    ジョブ一覧をプロセスプールで並列に生成し、ジョブ順の結果リストを返す。
+    入力エラーや出力ファイル名の重複はそのジョブの失敗として記録する。
+    sparse: Trueの場合はスパース出力（ExcelGeneratorのsparse）で生成。
+    compress_level: 保存時のZIP圧縮レベル（ExcelGeneratorのcompress_level）。
+    cache_dir: 指定した場合、生成結果のキャッシュ（data/workbook_cache.py）を使う。
+    """
+    results = [None] * len(jobs)
+    prepared = {}
+    used_paths = set()
+    for index, job in enumerate(jobs):
+        try:
+            args = prepare_job(job, output_dir)
+            if args[-1] in used_paths:
+                raise ValueError(f"出力ファイル名が他のジョブと重複しています: {args[-1]}")
+            used_paths.add(args[-1])
+            prepared[index] = args
+        except (KeyError, ValueError) as e:
+            results[index] = {
+                'title': job.get('title'),
+                'factory': job.get('factory'),
+                'output_path': None,
+                'ok': False,
+                'error': f"{type(e).__name__}: {e}",
+                'seconds': 0.0,
+            }
+
+    if prepared:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            indexes = list(prepared)
+            for index, result in zip(indexes, executor.map(partial(run_job, sparse=sparse, compress_level=compress_level, cache_dir=cache_dir), [prepared[i] for i in indexes])):
+                results[index] = result
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="工程表をまとめて生成します。")
+    parser.add_argument('jobs', help="ジョブ一覧（CSVまたはJSON）")
+    parser.add_argument('--output-dir', default='output', help="出力先ディレクトリ")
+    parser.add_argument('--workers', type=int, default=None, help="並列数（省略時はCPU数）")
+    parser.add_argument('--report', help="結果をJSONで書き出すパス")
+    parser.add_argument('--sparse', action='store_true', help="スパース出力（ファイルが小さく、Excelでの表示が速い）")
+    parser.add_argument('--compress-level', type=int, choices=range(10), default=None,
+                        help="保存時のZIP圧縮レベル（0は無圧縮で最も速い）")
+    parser.add_argument('--cache-dir', help="生成結果のキャッシュの保存先（同じ入力の工程表はコピーする）")
+    args = parser.parse_args(argv)
+
+    jobs = load_jobs(args.jobs)
+    started = time.perf_counter()
+    results = run_batch(jobs, args.output_dir, args.workers, args.sparse, args.compress_level,
+                        args.cache_dir)
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        if result['ok']:
+            print(f"OK  {result['seconds']:7.2f}s  {result['title']} -> {result['output_path']}")
+        else:
+            print(f"NG  {result['seconds']:7.2f}s  {result['title']}: {result['error']}")
+    succeeded = sum(1 for result in results if result['ok'])
+    print(f"{len(results)}件中{succeeded}件成功（合計 {elapsed:.2f}秒）")
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed': round(elapsed, 3), 'results': results}, f, ensure_ascii=False, indent=4)
+
+    return 0 if succeeded == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
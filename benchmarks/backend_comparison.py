@@ -0,0 +1,165 @@
+# benchmarks/backend_comparison.py
+"""
+書き出しバックエンド（openpyxl、XMLの直接書き出し）の比較。
+
+使い方:
+    python benchmarks/backend_comparison.py
+    python benchmarks/backend_comparison.py --months 1 6 60 --factories kihon --keep output_dir
+
+同じ工程表を各バックエンドで生成し、openpyxlで読み込んだ内容（値、フォント、塗りつぶし、罫線、
+文字位置、セル結合、行高さ、列幅、表示倍率、列の既定の書式、条件付き書式、シートの表示状態）を比較する。
+見た目に違いがあれば内容を表示して終了コード1を返す。あわせて各バックエンドの処理時間を表示する。
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import openpyxl
+from data.year_month import end_of_span
+from data.excel_generator import ExcelGenerator, BACKENDS
+from data.holiday_store import available_factories
+
+MONTH_COUNTS = [1, 6, 60, 240]
+START_DATE = datetime(2024, 1, 1)
+
+# 各バックエンドの生成方法（openpyxlは通常モードと書き込み専用モードの両方）
+VARIANTS = {
+    'openpyxl': {'backend': 'openpyxl', 'streaming': False},
+    'openpyxl_streaming': {'backend': 'openpyxl', 'streaming': True},
+    'xml': {'backend': 'xml'},
+}
+
+
+def color(value):
+    return value.rgb if value is not None else None
+
+
+def side(value):
+    return (value.style, color(value.color)) if value is not None else None
+
+
+def style_key(obj):
+    """セル、列の書式の比較用の値"""
+    font, fill, border, alignment = obj.font, obj.fill, obj.border, obj.alignment
+    return (
+        font.name, font.sz, font.b, color(font.color),
+        fill.fill_type, color(fill.fgColor) if fill.fill_type else None,
+        side(border.top), side(border.bottom), side(border.left), side(border.right),
+        alignment.horizontal, alignment.vertical,
+    )
+
+
+def differential_key(dxf):
+    """条件付き書式の書式の比較用の値"""
+    if dxf is None:
+        return None
+    return (
+        color(dxf.font.color) if dxf.font is not None else None,
+        (dxf.fill.fill_type, color(dxf.fill.bgColor)) if dxf.fill is not None else None,
+        tuple(side(getattr(dxf.border, name)) for name in ('top', 'bottom', 'left', 'right'))
+        if dxf.border is not None else None,
+    )
+
+
+def describe(path):
+    """ワークブックの見た目に関わる内容を辞書にまとめる（作成日のAE1は除く）"""
+    wb = openpyxl.load_workbook(path)
+    default_cell = None
+    sheets = {}
+    for ws in wb.worksheets:
+        cells = {}
+        for row in ws.iter_rows():
+            for cell in row:
+                if default_cell is None:
+                    default_cell = (None,) + style_key(openpyxl.Workbook().active['A1'])
+                value = 'DATE' if (ws.title == wb.worksheets[0].title and cell.coordinate == 'AE1') else cell.value
+                key = (value,) + style_key(cell)
+                if key != default_cell:
+                    cells[cell.coordinate] = key
+        formats = []
+        for cf in ws.conditional_formatting:
+            for rule in cf.rules:
+                formats.append((str(cf.sqref), tuple(rule.formula), differential_key(rule.dxf)))
+        sheets[ws.title] = {
+            'state': ws.sheet_state,
+            'zoom': ws.sheet_view.zoomScale,
+            'merged': sorted(str(merged) for merged in ws.merged_cells.ranges),
+            'heights': {row: dim.height for row, dim in ws.row_dimensions.items() if dim.height is not None},
+            'widths': {col: dim.width for col, dim in ws.column_dimensions.items() if dim.width},
+            'column_styles': {col: style_key(dim) for col, dim in ws.column_dimensions.items() if dim.has_style},
+            'conditional_formats': sorted(formats),
+            'cells': cells,
+        }
+    return sheets
+
+
+def differences(expected, actual, limit=10):
+    """2つのdescribe()の結果の違いを文字列のリストで返す"""
+    found = []
+    for title in sorted(set(expected) | set(actual)):
+        if title not in expected or title not in actual:
+            found.append(f"シート'{title}'が片方にしかありません")
+            continue
+        for key, value in expected[title].items():
+            other = actual[title][key]
+            if value == other:
+                continue
+            if key == 'cells':
+                for coordinate in sorted(set(value) | set(other)):
+                    if value.get(coordinate) != other.get(coordinate):
+                        found.append(f"{title}!{coordinate}: {value.get(coordinate)} != {other.get(coordinate)}")
+            else:
+                found.append(f"{title} {key}: {str(value)[:200]} != {str(other)[:200]}")
+    return found[:limit] + ([f"...ほか{len(found) - limit}件"] if len(found) > limit else [])
+
+
+def generate(variant, factory, months, sparse, output_path):
+    generator = ExcelGenerator(open_file=False, sparse=sparse, **VARIANTS[variant])
+    started = time.perf_counter()
+    generator.generate_excel("比較", START_DATE, end_of_span(START_DATE, months), factory, output_path)
+    return time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="書き出しバックエンドの出力を比較します。")
+    parser.add_argument('--months', type=int, nargs='+', default=MONTH_COUNTS, help="生成する月数")
+    parser.add_argument('--factories', nargs='+', default=None, help="工場（省略時はすべての休日データ）")
+    parser.add_argument('--keep', help="生成したファイルを残すディレクトリ")
+    args = parser.parse_args(argv)
+
+    factories = args.factories or available_factories()
+    failed = False
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = args.keep or temp_dir
+        os.makedirs(work_dir, exist_ok=True)
+        for factory in factories:
+            for months in args.months:
+                for sparse in (False, True):
+                    paths, times = {}, {}
+                    for variant in VARIANTS:
+                        paths[variant] = os.path.join(
+                            work_dir, f"{factory}_{months}{'_sparse' if sparse else ''}_{variant}.xlsx")
+                        times[variant] = generate(variant, factory, months, sparse, paths[variant])
+                    expected = describe(paths['openpyxl'])
+                    found = []
+                    for variant in VARIANTS:
+                        if variant != 'openpyxl':
+                            found += [f"[{variant}] {line}" for line in differences(expected, describe(paths[variant]))]
+                    timing = '  '.join(f"{variant} {seconds:.3f}s" for variant, seconds in times.items())
+                    label = f"{factory:>8} {months:>4}か月{' sparse' if sparse else '       '}"
+                    print(f"{'OK' if not found else 'NG'}  {label}  {timing}")
+                    for line in found:
+                        print(f"    {line}")
+                    failed = failed or bool(found)
+    print(f"比較したバックエンド: {', '.join(BACKENDS)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+# benchmarks/extend_benchmark.py
+"""
+生成済みの工程表の延長（ExcelGenerator.extend_excel）のベンチマーク。
+
+使い方:
+    python benchmarks/extend_benchmark.py
+    python benchmarks/extend_benchmark.py --months 60 180 --add 1 12 --repeat 5
+
+monthsか月分の工程表に数量を入力してからaddか月延長する場合と、months+addか月分を
+生成し直す場合の処理時間（中央値）を比較する。延長した工程表が生成し直した工程表と
+同じ内容（入力した数量を含む）かも確認し、違いがあれば終了コード1を返す。
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import openpyxl
+from data.year_month import end_of_span
+from data.excel_generator import ExcelGenerator
+from backend_comparison import describe, differences
+
+START_DATE = datetime(2024, 1, 1)
+
+# 延長の前に入力しておく内容（延長後も変わらないことを確認する）
+INPUTS = {'A12': "品目A", 'C12': 500, 'E12': 7}
+
+
+def generate_with_inputs(path, months, factory):
+    """工程表を生成し、INPUTSの内容を入力して保存"""
+    ExcelGenerator(open_file=False).generate_excel("延長", START_DATE, end_of_span(START_DATE, months), factory, path)
+    wb = openpyxl.load_workbook(path)
+    for ref, value in INPUTS.items():
+        wb.active[ref] = value
+    wb.save(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="工程表の延長をベンチマークします。")
+    parser.add_argument('--months', type=int, nargs='+', default=[12, 60, 180], help="延長する前の月数")
+    parser.add_argument('--add', type=int, nargs='+', default=[1, 12], help="追加する月数")
+    parser.add_argument('--factory', default='kihon', help="工場（休日データの識別子）")
+    parser.add_argument('--repeat', type=int, default=3, help="各ケースの繰り返し回数（中央値を記録）")
+    args = parser.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        source = os.path.join(work_dir, "source.xlsx")
+        extended = os.path.join(work_dir, "extended.xlsx")
+        rebuilt = os.path.join(work_dir, "rebuilt.xlsx")
+        for months in args.months:
+            generate_with_inputs(source, months, args.factory)
+            for add in args.add:
+                end_date = end_of_span(START_DATE, months + add)
+                extend_times, rebuild_times = [], []
+                for _ in range(args.repeat):
+                    started = time.perf_counter()
+                    ExcelGenerator(open_file=False).extend_excel(source, end_date, args.factory, extended)
+                    extend_times.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    ExcelGenerator(open_file=False).generate_excel("延長", START_DATE, end_date, args.factory, rebuilt)
+                    rebuild_times.append(time.perf_counter() - started)
+
+                # 比較のため、生成し直した工程表にも同じ内容を入力する
+                expected = os.path.join(work_dir, "expected.xlsx")
+                shutil.copyfile(rebuilt, expected)
+                wb = openpyxl.load_workbook(expected)
+                for ref, value in INPUTS.items():
+                    wb.active[ref] = value
+                wb.save(expected)
+                # openpyxlで保存し直すと結合セルの罫線の表し方が変わるため、延長した方も同じく保存し直す
+                wb = openpyxl.load_workbook(extended)
+                wb.save(extended)
+                found = differences(describe(expected), describe(extended))
+
+                extend_seconds = statistics.median(extend_times)
+                rebuild_seconds = statistics.median(rebuild_times)
+                print(f"{'OK' if not found else 'NG'}  {months:>4}か月 + {add:>3}か月  "
+                      f"延長 {extend_seconds:.3f}s  生成し直し {rebuild_seconds:.3f}s  "
+                      f"{rebuild_seconds / extend_seconds:.1f}倍")
+                for line in found:
+                    print(f"    {line}")
+                failed = failed or bool(found)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
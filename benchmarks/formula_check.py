@@ -0,0 +1,134 @@
+# benchmarks/formula_check.py
+"""
+残り数量の浅い数式（ExcelGeneratorのshallow_formulas）と計算結果の書き込み（cached_values）の確認。
+
+使い方:
+    python benchmarks/formula_check.py
+    python benchmarks/formula_check.py --months 6 60 240 600 --seed 1
+
+従来の数式と浅い数式の工程表を生成し、日にちの列と受注に同じ乱数の数量を入れて
+両方の数式を計算した結果（合計数量、残り数量）が完全に一致するかを確認する。
+あわせて数式の参照の深さ（最も長い依存の連鎖）と、書き込んだ計算結果が空の表の計算結果と
+一致するかを表示する。違いがあれば終了コード1を返す。
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+import openpyxl
+from openpyxl.utils import column_index_from_string
+from data.year_month import end_of_span
+from data.excel_generator import ExcelGenerator
+from data.month_template import FIRST_DAY_COL, LAST_DAY_COL
+
+START_DATE = datetime(2024, 1, 1)
+SUM_RE = re.compile(r'^SUM\(([A-Z]+)(\d+):([A-Z]+)(\d+)\)$')
+REF_RE = re.compile(r'^([A-Z]+)(\d+)$')
+
+
+def number(value):
+    """Excelの算術と同じく、数値の文字列は数値、空は0として扱う"""
+    if value is None:
+        return 0
+    return float(value) if isinstance(value, str) else value
+
+
+def evaluate(ws, inputs):
+    """
+    シートの数式（SUM(範囲)と参照の引き算）をinputs {(行, 列): 値} を入れた状態で計算し、
+    ({(行, 列): 結果}, 参照の最大の深さ) を返す。数式は上の行・左の列だけを参照するため、行と列の順に計算する。
+    """
+    values, depths = {}, {}
+    for row in ws.iter_rows():
+        for cell in row:
+            key = (cell.row, cell.column)
+            value = inputs.get(key, cell.value)
+            if not (isinstance(value, str) and value.startswith('=')):
+                values[key] = value
+                continue
+            body = value[1:]
+            match = SUM_RE.match(body)
+            if match:
+                first_col, first_row, last_col, last_row = match.groups()
+                refs = [(r, c) for r in range(int(first_row), int(last_row) + 1)
+                        for c in range(column_index_from_string(first_col), column_index_from_string(last_col) + 1)]
+                values[key] = sum(number(values.get(ref)) for ref in refs)
+            else:
+                refs = []
+                for term in body.split('-'):
+                    col, ref_row = REF_RE.match(term).groups()
+                    refs.append((int(ref_row), column_index_from_string(col)))
+                result = number(values.get(refs[0]))
+                for ref in refs[1:]:
+                    result -= number(values.get(ref))
+                values[key] = result
+            depths[key] = 1 + max((depths.get(ref, 0) for ref in refs), default=0)
+    return values, max(depths.values(), default=0)
+
+
+def random_inputs(ws, rng):
+    """受注（C列）と日にちの列の入力部分に乱数の数量（小数を含む）を入れる"""
+    inputs = {}
+    for row in ws.iter_rows(min_col=35, max_col=35):
+        cell = row[0]
+        if isinstance(cell.value, str) and cell.value.startswith('=SUM'):
+            inputs[(cell.row, 3)] = rng.choice([0, 100, 250.5, 1e6 + 0.1])
+            for col in range(FIRST_DAY_COL, LAST_DAY_COL + 1):
+                if rng.random() < 0.3:
+                    inputs[(cell.row, col)] = rng.choice([1, 2.5, 0.1, 10, 33.3])
+    return inputs
+
+
+def formula_results(values, ws):
+    """合計数量と残り数量の列の計算結果"""
+    return {key: value for key, value in values.items() if key[1] in (35, 36)
+            and isinstance(ws.cell(*key).value, str) and ws.cell(*key).value.startswith('=')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="浅い数式と計算結果の書き込みを確認します。")
+    parser.add_argument('--months', type=int, nargs='+', default=[6, 60, 240], help="生成する月数")
+    parser.add_argument('--factory', default='kihon', help="工場（休日データの識別子）")
+    parser.add_argument('--seed', type=int, default=0, help="数量の乱数のシード")
+    args = parser.parse_args(argv)
+
+    failed = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        for months in args.months:
+            paths = {}
+            for name, options in (('chain', {}), ('shallow', {'shallow_formulas': True, 'cached_values': True})):
+                paths[name] = os.path.join(work_dir, f"{name}_{months}.xlsx")
+                ExcelGenerator(open_file=False, **options).generate_excel(
+                    "確認", START_DATE, end_of_span(START_DATE, months), args.factory, paths[name])
+            chain_ws = openpyxl.load_workbook(paths['chain']).active
+            shallow_ws = openpyxl.load_workbook(paths['shallow']).active
+
+            inputs = random_inputs(chain_ws, random.Random(args.seed))
+            chain_values, chain_depth = evaluate(chain_ws, inputs)
+            shallow_values, shallow_depth = evaluate(shallow_ws, inputs)
+            expected = formula_results(chain_values, chain_ws)
+            mismatched = [key for key, value in expected.items() if shallow_values.get(key) != value]
+
+            # 書き込んだ計算結果と、入力のない状態で計算した結果
+            empty_values, _depth = evaluate(shallow_ws, {})
+            cached_ws = openpyxl.load_workbook(paths['shallow'], data_only=True).active
+            stale = [key for key, value in formula_results(empty_values, shallow_ws).items()
+                     if cached_ws.cell(*key).value != value]
+
+            ok = not mismatched and not stale and len(expected) > 0
+            print(f"{'OK' if ok else 'NG'}  {months:>4}か月  数式{len(expected)}個  "
+                  f"参照の深さ 従来{chain_depth} -> 浅い数式{shallow_depth}  "
+                  f"結果の不一致{len(mismatched)}  計算結果の不一致{len(stale)}")
+            failed = failed or not ok
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+# benchmarks/generator_benchmark.py
+"""
+ExcelGeneratorのベンチマーク（画面・ファイル表示なしで実行）。
+
+使い方:
+    python benchmarks/generator_benchmark.py --output result.json
+    python benchmarks/generator_benchmark.py --save-baseline      # 現在の結果を基準として保存
+    python benchmarks/generator_benchmark.py --threshold 0.2      # 基準より20%以上遅い・重い場合は終了コード1
+
+基準のファイル（--baseline、既定は benchmarks/generator_baseline.json）がない場合は比較できないため終了コード2を返す。
+基準は計測するマシンで --save-baseline を実行して作成する（マシンごとに値が異なるためリポジトリには含めない）。
+
+data/holidays のすべての休日カレンダーについて 1, 6, 60, 240か月の工程表を生成し、
+処理時間、保存（wb.save）にかかった時間、最大メモリ使用量（tracemalloc）、出力ファイルサイズを記録する。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from data.year_month import end_of_span
+from data.excel_generator import ExcelGenerator, BACKENDS
+from data.holiday_store import available_factories
+
+MONTH_COUNTS = [1, 6, 60, 240]
+START_DATE = datetime(2024, 1, 1)
+DEFAULT_BASELINE = os.path.join(PROJECT_DIR, 'benchmarks', 'generator_baseline.json')
+
+# 基準と比較する項目
+COMPARED_METRICS = ['wall_seconds', 'save_seconds', 'peak_memory_bytes']
+
+
+class TimedExcelGenerator(ExcelGenerator):
+    """保存にかかった時間を記録するExcelGenerator"""
+    def save_and_open(self, output_path):
+        started = time.perf_counter()
+        super().save_and_open(output_path)
+        self.save_seconds = time.perf_counter() - started
+
+
+def generate_once(factory, months, output_path, trace_memory=False, sparse=False, compress_level=None,
+                  backend=None):
+    """1回生成し、(処理時間, 保存時間, 最大メモリ) を返す"""
+    generator = TimedExcelGenerator(open_file=False, sparse=sparse, compress_level=compress_level, backend=backend)
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        generator.generate_excel("ベンチマーク", START_DATE, end_of_span(START_DATE, months), factory, output_path)
+        wall = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return wall, generator.save_seconds, peak
+
+
+def run_case(factory, months, repeat, work_dir, sparse=False, compress_level=None, backend=None):
+    """1つの組み合わせを計測（時間は中央値、メモリは計測用の別の1回で取得）"""
+    output_path = os.path.join(work_dir, f"{factory}_{months}.xlsx")
+    walls, saves = [], []
+    for _ in range(repeat):
+        wall, save, _peak = generate_once(factory, months, output_path, sparse=sparse,
+                                          compress_level=compress_level, backend=backend)
+        walls.append(wall)
+        saves.append(save)
+    _wall, _save, peak = generate_once(factory, months, output_path, trace_memory=True, sparse=sparse,
+                                       compress_level=compress_level, backend=backend)
+    return {
+        'factory': factory,
+        'months': months,
+        'sparse': sparse,
+        'compress_level': compress_level,
+        'backend': backend,
+        'wall_seconds': round(statistics.median(walls), 4),
+        'save_seconds': round(statistics.median(saves), 4),
+        'peak_memory_bytes': peak,
+        'file_size_bytes': os.path.getsize(output_path),
+    }
+
+
+def case_key(result):
+    key = f"{result['factory']}-{result['months']}"
+    if result.get('sparse'):
+        key += '-sparse'
+    if result.get('compress_level') is not None:
+        key += f"-z{result['compress_level']}"
+    if result.get('backend'):
+        key += f"-{result['backend']}"
+    return key
+
+
+def compare(results, baseline, threshold):
+    """基準と比較し、threshold（割合）を超えて悪化した項目の一覧を返す"""
+    baseline_cases = {case_key(case): case for case in baseline.get('cases', [])}
+    regressions = []
+    for result in results:
+        base = baseline_cases.get(case_key(result))
+        if base is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if base.get(metric) and result[metric] > base[metric] * (1 + threshold):
+                regressions.append(f"{case_key(result)} {metric}: {base[metric]} -> {result[metric]}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ExcelGeneratorのベンチマーク")
+    parser.add_argument('--months', type=int, nargs='+', default=MONTH_COUNTS, help="生成する月数")
+    parser.add_argument('--factories', nargs='+', default=None, help="工場（省略時はすべての休日データ）")
+    parser.add_argument('--repeat', type=int, default=3, help="時間計測の繰り返し回数")
+    parser.add_argument('--sparse', action='store_true', help="スパース出力で生成")
+    parser.add_argument('--compress-level', type=int, default=None, help="保存時のZIP圧縮レベル（0は無圧縮）")
+    parser.add_argument('--backend', choices=BACKENDS, default=None, help="書き出しバックエンド（省略時は自動）")
+    parser.add_argument('--output', help="結果をJSONで書き出すパス")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="比較する基準のJSON")
+    parser.add_argument('--save-baseline', action='store_true', help="結果を基準として保存")
+    parser.add_argument('--threshold', type=float, default=0.2, help="悪化とみなす割合（0.2 = 20%%）")
+    args = parser.parse_args(argv)
+
+    factories = args.factories or available_factories()
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for factory in factories:
+            for months in args.months:
+                result = run_case(factory, months, args.repeat, work_dir, args.sparse, args.compress_level,
+                                  args.backend)
+                results.append(result)
+                print(f"{factory:>8} {months:>4}か月  {result['wall_seconds']:8.3f}s  "
+                      f"save {result['save_seconds']:7.3f}s  "
+                      f"peak {result['peak_memory_bytes'] / 1e6:7.1f}MB  "
+                      f"file {result['file_size_bytes'] / 1e3:8.1f}KB")
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cases': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+        print(f"基準を保存しました: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        # 比較できないまま成功扱いにすると悪化を見逃すため、失敗として扱う
+        print(f"基準が見つかりません: {args.baseline}（--save-baseline で作成してください）。")
+        return 2
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"悪化: {regression}")
+    if regressions:
+        return 1
+    print("基準からの悪化はありません。")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/multi_sheet_benchmark.py
+"""
+複数の工程表を1つのワークブックにまとめる生成（ExcelGenerator.generate_workbook）のベンチマーク。
+
+使い方:
+    python benchmarks/multi_sheet_benchmark.py
+    python benchmarks/multi_sheet_benchmark.py --months 60 --backend openpyxl --streaming --repeat 5
+
+工場ごとに別々のファイルを生成する場合（generate_excelをN回）と、1つのワークブックの
+別々のシートとして生成する場合の処理時間（中央値）と合計ファイルサイズを比較する。
+まとめた生成は書き出しバックエンドを全シートの合計月数で選ぶため、比較では両方に同じ
+バックエンドと書き込み専用モード（--backend、--streaming）を指定する。
+'xml'バックエンドでは、まとめた生成は別々の生成の約1.1~1.5倍の速さ。
+まとめた生成の方が速くない場合は終了コード1を返す。
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from data.year_month import end_of_span
+from data.excel_generator import ExcelGenerator, Schedule, BACKENDS
+from data.factories import FACTORIES_MAPPING
+
+START_DATE = datetime(2024, 1, 1)
+
+
+def schedules_for(months):
+    """工場の選択肢ごとの工程表（シート名は工場名）"""
+    end_date = end_of_span(START_DATE, months)
+    return [Schedule("比較", START_DATE, end_date, factory, name) for name, factory in FACTORIES_MAPPING.items()]
+
+
+def run_separate(schedules, work_dir, options):
+    """工場ごとに別々のファイルを生成し、(処理時間, 合計ファイルサイズ) を返す"""
+    paths = [os.path.join(work_dir, f"separate_{index}.xlsx") for index in range(len(schedules))]
+    started = time.perf_counter()
+    for schedule, path in zip(schedules, paths):
+        ExcelGenerator(open_file=False, **options).generate_excel(
+            schedule.title, schedule.start_date, schedule.end_date, schedule.factory, path)
+    elapsed = time.perf_counter() - started
+    return elapsed, sum(os.path.getsize(path) for path in paths)
+
+
+def run_combined(schedules, work_dir, options):
+    """1つのワークブックにまとめて生成し、(処理時間, ファイルサイズ) を返す"""
+    path = os.path.join(work_dir, "combined.xlsx")
+    started = time.perf_counter()
+    ExcelGenerator(open_file=False, **options).generate_workbook(schedules, path)
+    elapsed = time.perf_counter() - started
+    return elapsed, os.path.getsize(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="複数シートの工程表の生成をベンチマークします。")
+    parser.add_argument('--months', type=int, nargs='+', default=[6, 60], help="各シートの月数")
+    parser.add_argument('--repeat', type=int, default=3, help="各ケースの繰り返し回数（中央値を記録）")
+    parser.add_argument('--sparse', action='store_true', help="スパース出力で計測")
+    parser.add_argument('--backend', choices=BACKENDS, default='xml',
+                        help="書き出しバックエンド（別々の生成とまとめた生成で同じものを使う）")
+    parser.add_argument('--streaming', action='store_true',
+                        help="openpyxlのバックエンドで書き込み専用モードを使う（省略時は通常モード）")
+    args = parser.parse_args(argv)
+    if args.streaming and args.backend != 'openpyxl':
+        parser.error("--streaming はopenpyxlのバックエンドでのみ指定できます。")
+
+    # 月数によるバックエンドと書き込み専用モードの自動選択で両者の条件が変わらないよう、どちらも固定する
+    options = {'sparse': args.sparse, 'backend': args.backend}
+    if args.backend == 'openpyxl':
+        options['streaming'] = args.streaming
+    failed = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        for months in args.months:
+            schedules = schedules_for(months)
+            separate = [run_separate(schedules, work_dir, options) for _ in range(args.repeat)]
+            combined = [run_combined(schedules, work_dir, options) for _ in range(args.repeat)]
+            separate_seconds = statistics.median(seconds for seconds, _size in separate)
+            combined_seconds = statistics.median(seconds for seconds, _size in combined)
+            speedup = separate_seconds / combined_seconds if combined_seconds else float('inf')
+            print(f"{len(schedules)}シート x {months:>4}か月  "
+                  f"別々 {separate_seconds:.3f}s ({separate[0][1] / 1024:.0f}KB)  "
+                  f"まとめて {combined_seconds:.3f}s ({combined[0][1] / 1024:.0f}KB)  "
+                  f"{speedup:.2f}倍")
+            failed = failed or combined_seconds >= separate_seconds
+    if failed:
+        print("まとめた生成が別々の生成より速くありません。")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+# benchmarks/parallel_sheet_benchmark.py
+"""
+年ごとのシートに分けた生成（ExcelGeneratorのsplit）の並列化のベンチマーク。
+
+使い方:
+    python benchmarks/parallel_sheet_benchmark.py
+    python benchmarks/parallel_sheet_benchmark.py --years 10 20 40 --workers 8 --split fiscal_year --repeat 5
+
+1シートの生成、年ごとのシートを既定の設定で生成（順に組み立てる）、年ごとのシートを並列に生成
+（--workers、月数によらず並列にする）の処理時間（中央値）と、1年分のシートの組み立て時間を比較する。
+並列の生成はこのOSの既定の起動方法（Linuxではfork）と、Windowsと同じspawnの両方で計測する
+（既定の設定の生成はspawnで計測する）。
+並列の生成結果が順に生成した結果と異なる場合、既定の設定の生成が1シートの生成のSPLIT_MAX_RATIO倍より
+遅い場合（ワーカープロセスの起動で遅くなっている）は終了コード1を返す。
+CPUが1つの環境では並列にしても速くならない。
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from data.year_month import end_of_span, month_span
+from data.excel_generator import ExcelGenerator, SPLIT_MODES, split_schedule
+from backend_comparison import describe, differences
+
+START_DATE = datetime(2024, 1, 1)
+
+# 年ごとのシートに分けた既定の生成が、1シートの生成の何倍まで遅くてよいか
+SPLIT_MAX_RATIO = 2.0
+
+
+@contextmanager
+def start_method(method):
+    """ワーカープロセスの起動方法（'fork'、'spawn'）を一時的に切り替える"""
+    previous = multiprocessing.get_start_method()
+    multiprocessing.set_start_method(method, force=True)
+    try:
+        yield
+    finally:
+        multiprocessing.set_start_method(previous, force=True)
+
+
+def timed_generate(path, end_date, factory, repeat, **options):
+    """repeat回生成し、処理時間の中央値を返す"""
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ExcelGenerator(open_file=False, backend='xml', **options).generate_excel(
+            "並列", START_DATE, end_date, factory, path)
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds)
+
+
+def longest_sheet_seconds(end_date, factory, split, repeat):
+    """最も月数の多いシート1枚分の組み立て時間（中央値）"""
+    schedules = split_schedule("並列", START_DATE, end_date, factory, split)
+    schedule = max(schedules, key=lambda item: month_span(item.start_date, item.end_date))
+    created_date_str = datetime.now().strftime('%Y/%m/%d')
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        ExcelGenerator(open_file=False, profile=False).render_sheet(
+            schedule, schedule.sheet_title, "休日", None, created_date_str)
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="年ごとのシートの並列生成をベンチマークします。")
+    parser.add_argument('--years', type=int, nargs='+', default=[5, 20], help="生成する年数")
+    parser.add_argument('--split', choices=SPLIT_MODES, default='year', help="シートの分け方")
+    parser.add_argument('--workers', type=int, default=max(os.cpu_count() or 1, 2), help="並列数")
+    parser.add_argument('--factory', default='kihon', help="工場（休日データの識別子）")
+    parser.add_argument('--repeat', type=int, default=3, help="各ケースの繰り返し回数（中央値を記録）")
+    parser.add_argument('--sparse', action='store_true', help="スパース出力で計測")
+    args = parser.parse_args(argv)
+
+    print(f"CPU数 {os.cpu_count()}  並列数 {args.workers}")
+    failed = False
+    with tempfile.TemporaryDirectory() as work_dir:
+        single_path = os.path.join(work_dir, "single.xlsx")
+        sequential_path = os.path.join(work_dir, "sequential.xlsx")
+        parallel_path = os.path.join(work_dir, "parallel.xlsx")
+        spawn_path = os.path.join(work_dir, "spawn.xlsx")
+        for years in args.years:
+            end_date = end_of_span(START_DATE, years * 12)
+            single = timed_generate(single_path, end_date, args.factory, args.repeat, sparse=args.sparse)
+            parallel = timed_generate(parallel_path, end_date, args.factory, args.repeat, sparse=args.sparse,
+                                      split=args.split, workers=args.workers, parallel_min_months=0)
+            # 既定の設定の生成もspawnで計測する（ワーカープロセスを起動していれば遅くなる）
+            with start_method('spawn'):
+                sequential = timed_generate(sequential_path, end_date, args.factory, args.repeat,
+                                            sparse=args.sparse, split=args.split)
+                spawned = timed_generate(spawn_path, end_date, args.factory, args.repeat, sparse=args.sparse,
+                                         split=args.split, workers=args.workers, parallel_min_months=0)
+            one_sheet = longest_sheet_seconds(end_date, args.factory, args.split, args.repeat)
+            found = differences(describe(sequential_path), describe(parallel_path))
+            found += differences(describe(sequential_path), describe(spawn_path))
+            if sequential > single * SPLIT_MAX_RATIO:
+                found.append(f"既定の設定の生成が1シートの生成の{sequential / single:.1f}倍かかっています")
+            print(f"{'OK' if not found else 'NG'}  {years:>3}年  1シート {single:.3f}s  既定 {sequential:.3f}s  "
+                  f"並列 {parallel:.3f}s  並列(spawn) {spawned:.3f}s  1年分のシート {one_sheet:.3f}s")
+            for line in found:
+                print(f"    {line}")
+            failed = failed or bool(found)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# benchmarks/service_load_test.py
+"""
+工程表の生成サービス（service.py）の負荷試験（1台のマシンで完結）。
+
+使い方:
+    python benchmarks/service_load_test.py
+    python benchmarks/service_load_test.py --requests 200 --concurrency 16 --workers 4 --months 6 60
+
+サービスを空いているポートで起動し、複数のクライアントから POST /generate を同時に送って
+ファイルを受け取るまでの時間（中央値、95パーセンタイル）と処理件数/秒、最後に /metrics の内容を表示する。
+失敗したリクエスト（503を含む）があれば終了コード1を返す。
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from data.factories import FACTORIES_MAPPING
+from data.year_month import parse_month, format_month
+from service import ScheduleService, make_server, percentile
+
+
+def job_for(index, months):
+    """index番目のリクエストの内容（工場と月数を順に切り替える）"""
+    factories = list(FACTORIES_MAPPING)
+    count = months[index % len(months)]
+    start_index = parse_month('2024/01')
+    return {
+        'title': f"負荷試験{index}",
+        'start': format_month(start_index),
+        'end': format_month(start_index + count - 1),
+        'factory': factories[index % len(factories)],
+    }
+
+
+def post_generate(base_url, job):
+    """POST /generate を送り、(成否, 所要時間, 受け取ったバイト数) を返す"""
+    request = Request(f"{base_url}/generate", data=json.dumps(job).encode('utf-8'),
+                      headers={'Content-Type': 'application/json'}, method='POST')
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=600) as response:
+            size = len(response.read())
+            ok = response.status == 200 and size > 0
+    except HTTPError as e:
+        e.read()
+        ok, size = False, 0
+    return ok, time.perf_counter() - started, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="工程表の生成サービスに負荷をかけます。")
+    parser.add_argument('--requests', type=int, default=60, help="送るリクエストの数")
+    parser.add_argument('--concurrency', type=int, default=8, help="同時に送るクライアントの数")
+    parser.add_argument('--workers', type=int, default=None, help="サービスのワーカー数（省略時はCPU数）")
+    parser.add_argument('--max-queue', type=int, default=64, help="サービスの待ちのジョブの上限")
+    parser.add_argument('--months', type=int, nargs='+', default=[6, 12, 60], help="生成する月数（順に使う）")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        service = ScheduleService(output_dir, args.workers, args.max_queue)
+        service.warm_up()
+        server = make_server(service, port=0, quiet=True)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+                results = list(clients.map(lambda index: post_generate(base_url, job_for(index, args.months)),
+                                           range(args.requests)))
+            elapsed = time.perf_counter() - started
+            with urlopen(f"{base_url}/metrics") as response:
+                metrics = json.load(response)
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+    latencies = [seconds for ok, seconds, _size in results if ok]
+    failed = sum(1 for ok, _seconds, _size in results if not ok)
+    print(f"{args.requests}件（同時{args.concurrency}、ワーカー{service.workers}）  {elapsed:.2f}s  "
+          f"{args.requests / elapsed:.1f}件/秒  失敗{failed}件")
+    if latencies:
+        print(f"応答時間 p50 {percentile(latencies, 0.5):.3f}s  p95 {percentile(latencies, 0.95):.3f}s  "
+              f"最大 {max(latencies):.3f}s")
+    print(json.dumps(metrics, ensure_ascii=False, indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+# benchmarks/startup_benchmark.py
+"""
+起動時間（最初のウィンドウが表示されるまでの時間）の計測。
+
+使い方:
+    python benchmarks/startup_benchmark.py --budget 1.5 --runs 5 --output startup.json
+
+新しいPythonプロセスを -X importtime 付きで起動し、mainモジュールの読み込みと
+MainUIの表示（root.update()の完了）までの時間を計測する。
+中央値が予算（秒）を超えた場合、または起動時に重いモジュール（openpyxl、requestsなど）が
+読み込まれていた場合は終了コード1を返す。
+画面のない環境ではウィンドウを作れないため、mainモジュールの読み込み時間で判定する。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 起動時に読み込まれてはいけないモジュール（初回使用時に読み込む）
+LAZY_MODULES = ['openpyxl', 'requests', 'packaging', 'jpholiday', 'data.excel_generator']
+
+# 子プロセスで実行するコード
+CHILD_CODE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter() - started
+window = None
+try:
+    import tkinter as tk
+    from ui.main_ui import MainUI
+    root = tk.Tk()
+    MainUI(root)
+    root.update()
+    window = time.perf_counter() - started
+    root.destroy()
+except Exception as e:
+    print(f"ウィンドウを作成できませんでした: {e}", file=sys.stderr)
+print(json.dumps({
+    'import': imported,
+    'window': window,
+    'loaded': [name for name in LAZY_MODULES if name in sys.modules],
+}))
+"""
+
+
+def parse_importtime(stderr, top=10):
+    """-X importtime の出力から、累積時間の大きいモジュールを取得"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        imports.append((int(cumulative_us), name.rstrip()))
+    imports.sort(reverse=True)
+    return [{'module': name.strip(), 'cumulative_ms': round(us / 1000, 2), 'depth': len(name) - len(name.lstrip())}
+            for us, name in imports[:top]]
+
+
+def run_once():
+    """子プロセスで1回起動を計測"""
+    code = f"LAZY_MODULES = {LAZY_MODULES!r}\n" + CHILD_CODE
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=PROJECT_DIR, capture_output=True, text=True, encoding='utf-8', errors='replace'
+    )
+    wall = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr else "起動に失敗しました。")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['process'] = wall
+    result['imports'] = parse_importtime(completed.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="起動時間を計測し、予算を超えていないか確認します。")
+    parser.add_argument('--runs', type=int, default=5, help="計測回数")
+    parser.add_argument('--budget', type=float, default=1.5, help="最初のウィンドウ表示までの予算（秒）")
+    parser.add_argument('--output', help="結果をJSONで書き出すパス")
+    args = parser.parse_args(argv)
+
+    runs = [run_once() for _ in range(args.runs)]
+    has_window = all(run['window'] is not None for run in runs)
+    metric = 'window' if has_window else 'import'
+    median = statistics.median(run[metric] for run in runs)
+    loaded = sorted({name for run in runs for name in run['loaded']})
+
+    report = {
+        'metric': metric,
+        'median_seconds': round(median, 4),
+        'budget_seconds': args.budget,
+        'process_median_seconds': round(statistics.median(run['process'] for run in runs), 4),
+        'lazy_modules_loaded': loaded,
+        'slowest_imports': runs[-1]['imports'],
+    }
+    print(f"{'最初のウィンドウ表示' if has_window else 'mainの読み込み'}: 中央値 {median:.3f}秒（予算 {args.budget:.3f}秒）")
+    for item in report['slowest_imports']:
+        print(f"  {item['cumulative_ms']:9.2f} ms  {item['module']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+    failed = False
+    if median > args.budget:
+        print("起動時間が予算を超えています。")
+        failed = True
+    if loaded:
+        print(f"起動時に読み込まれるべきでないモジュールがあります: {', '.join(loaded)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
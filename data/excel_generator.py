@@ -1,270 +1,526 @@
 # data/excel_generator.py
-from tkinter import messagebox
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-import json
-import os
-import calendar
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from data.schedule_layout import ScheduleLayout, SHEET_TITLE, HOLIDAY_FLAG_SHEET, sheet_titles
+from data.month_template import shared_template
+from data.openpyxl_writer import OpenpyxlWriter
+from data.xml_writer import XmlWriter
+from data.holiday_store import get_holiday_calendar, get_holiday_digest
+from data.generation_profile import GenerationProfile
+from data.workbook_extender import WorkbookExtender
+from data.year_month import (month_index, year_month, date_index, index_date, month_span, month_range,
+                             reiwa_title)
+from utils.file_helper import atomic_output, open_file_async
 from datetime import datetime
 
+# この月数を超える場合は高速な書き出しバックエンド（XMLを直接書き出す）で生成
+STREAMING_MONTH_THRESHOLD = 60
+
+# 書き出しバックエンド
+BACKENDS = ('openpyxl', 'xml')
+
+# シートの分け方（年ごと、年度ごと）と年度の開始月
+SPLIT_MODES = ('year', 'fiscal_year')
+FISCAL_YEAR_START_MONTH = 4
+
+# 並列の生成で、キャンセルを確認する間隔（秒）
+CANCEL_POLL_SECONDS = 0.1
+
+# 並列に組み立てる2つ目以降のシートの合計月数がこれ未満の場合は、workersを指定しても順に組み立てる
+# （spawnで起動するWindowsでは、ワーカー4つの起動とopenpyxlなどの読み込みに約1.5秒かかり、
+# 1か月分の組み立ては約1ミリ秒のため、100年分程度ないと並列にしても速くならない）
+PARALLEL_MIN_MONTHS = 1200
+
+# 出力の内容を変更した場合は上げる（生成結果のキャッシュを無効にするため）
+GENERATOR_VERSION = 1
+
+# 1つのワークブックにまとめる工程表（1シート分）
+# sheet_titleを省略した場合はtitleをシート名にする
+Schedule = namedtuple('Schedule', ['title', 'start_date', 'end_date', 'factory', 'sheet_title'],
+                      defaults=[None])
+
+
+def split_schedule(title, start_date, end_date, factory, split):
+    """
+    工程表を年（split='year'）または年度（'fiscal_year'、4月~翌3月）ごとのScheduleに分ける。
+    シート名は'2024年'、'2024年度'。
+    """
+    if split not in SPLIT_MODES:
+        raise ValueError(f"シートの分け方は {', '.join(SPLIT_MODES)} のいずれかを指定してください。")
+    first_month = 1 if split == 'year' else FISCAL_YEAR_START_MONTH
+    suffix = '年' if split == 'year' else '年度'
+    end_index = date_index(end_date)
+    index = date_index(start_date)
+    schedules = []
+    while index <= end_index:
+        year, month = year_month(index)
+        period_year = year if month >= first_month else year - 1
+        # 年（年度）の最後の月と終了年月の早い方まで
+        last_index = min(end_index, month_index(period_year, first_month) + 11)
+        schedules.append(Schedule(title, index_date(index), index_date(last_index), factory, f"{period_year}{suffix}"))
+        index = last_index + 1
+    return schedules
+
+
+def render_sheet(job):
+    """
+    並列の生成でワーカープロセスが実行する、1シート分の組み立て（ExcelGenerator.render_sheet）。
+    """
+    options, schedule, sheet_title, flag_title, carry_from, created_date_str = job
+    generator = ExcelGenerator(open_file=False, profile=False, **options)
+    return generator.render_sheet(schedule, sheet_title, flag_title, carry_from, created_date_str)
+
+
+class GenerationCancelled(Exception):
+    """
+    生成がキャンセルされた場合に送出。
+    """
+
 class ExcelGenerator:
-    def __init__(self):
-        self.wb = openpyxl.Workbook()
-        self.ws = self.wb.active
-        self.ws.title = "製造工程"
+    def __init__(self, streaming=None, open_file=True, profile=None, sparse=False, compress_level=None,
+                 backend=None, cache=None, shallow_formulas=False, cached_values=False, split=None, workers=1,
+                 parallel_min_months=PARALLEL_MIN_MONTHS):
+        """
+        backend: 'openpyxl'（openpyxlのワークブックに書き出す）または'xml'（シートのXMLを直接書き出す、高速）。
+                 Noneの場合は生成する月数に応じて自動で選択（長い期間は'xml'）。
+        streaming: openpyxlのバックエンドで、Trueで書き込み専用モード、Falseで通常モード。
+                   指定した場合はopenpyxlのバックエンドを使う。
+        open_file: Falseの場合、保存後にファイルを開かない（バッチ処理用）。
+                   Trueの場合はOSの既定のアプリケーションで、完了を待たずに開く。
+        profile: Trueでフェーズごとの処理時間を計測。Noneの場合は環境変数
+                 WORK_SCHEDULER_PROFILE に従う（data/generation_profile.py）。
+        sparse: Trueの場合、フォントと文字位置を列の既定の書式にし、値か固有の罫線があるセルだけを書き込む。
+                入力部分の罫線と休日の色付けは条件付き書式で行う（ファイルが小さく、Excelでの表示も速い）。
+        compress_level: 保存時のZIP圧縮レベル。0は無圧縮（保存が最も速い）、1~9はdeflateの圧縮レベル、
+                        Noneは既定（openpyxlと同じdeflate）。
+        cache: WorkbookCache（data/workbook_cache.py）。指定した場合、同じ入力の工程表は作り直さずに
+               キャッシュからコピーする（作成日だけ差し替える）。
+        shallow_formulas: Trueの場合、残り数量を前月の残りからではなく1つ目の表の受注から各月の合計数量を
+                          引く数式にする。計算結果は同じで、長い期間でもExcelでの再計算が速い。
+        cached_values: Trueの場合、合計数量と残り数量の計算結果を数式と一緒に書き込み、
+                       Excelで開いたときに全体を再計算させない（'xml'バックエンドのみ対応）。
+        split: 'year'で年ごと、'fiscal_year'で年度（4月~翌3月）ごとにシートを分ける（split_schedule）。
+               各シートの1つ目の表の残り数量は、前のシートの最後の表の残りから引き継ぐ。
+               'xml'バックエンドでworkersが2以上の場合は、2つ目以降のシートをワーカープロセスで並列に組み立てる。
+        workers: シートを分ける場合の並列数（プロセス数）。既定の1は並列にしない（ワーカープロセスを起動しない）。
+        parallel_min_months: 2つ目以降のシートの合計月数がこれ未満の場合は、workersによらず順に組み立てる
+                             （ワーカープロセスの起動の時間の方が長くなるため）。
+        """
+        if compress_level is not None and not 0 <= compress_level <= 9:
+            raise ValueError("圧縮レベルは0~9で指定してください。")
+        if backend is not None and backend not in BACKENDS:
+            raise ValueError(f"書き出しバックエンドは {', '.join(BACKENDS)} のいずれかを指定してください。")
+        if cached_values and (backend == 'openpyxl' or streaming is not None):
+            raise ValueError("計算結果の書き込みは'xml'バックエンドのみ対応しています。")
+        if split is not None and split not in SPLIT_MODES:
+            raise ValueError(f"シートの分け方は {', '.join(SPLIT_MODES)} のいずれかを指定してください。")
+        if workers < 1:
+            raise ValueError("並列数は1以上で指定してください。")
+        self.backend = backend
+        self.streaming = streaming
+        self.sparse = sparse
+        self.compress_level = compress_level
+        self.shallow_formulas = shallow_formulas
+        self.cached_values = cached_values
+        self.split = split
+        self.workers = workers
+        self.parallel_min_months = parallel_min_months
+        self.open_file = open_file
+        self.cache = cache
+        self.cache_hit = False
+        self.profile_mode = profile
+        self.profile = GenerationProfile()
+        self.layout = None
+        self.writer = None
+
+    def resolve_backend(self, month_count):
+        """
+        月数（複数のシートの場合は合計）と指定に応じて使う書き出しバックエンド（'openpyxl'または'xml'）。
+        """
+        if self.backend is not None:
+            return self.backend
+        if self.cached_values or (self.streaming is None and month_count > STREAMING_MONTH_THRESHOLD):
+            return 'xml'
+        return 'openpyxl'
+
+    def create_writer(self, layout, month_count):
+        """
+        月数と指定に応じて書き出しバックエンドを作成。
+        """
+        if self.resolve_backend(month_count) == 'xml':
+            return XmlWriter(layout, compress_level=self.compress_level)
+        streaming = self.streaming
+        if streaming is None:
+            streaming = month_count > STREAMING_MONTH_THRESHOLD
+        return OpenpyxlWriter(layout, streaming=streaming, compress_level=self.compress_level)
 
     def gregorian_to_reiwa(self, year, month):
         """
         西暦を令和に変換する関数。
         令和元年は2019年。
         """
-        if year < 2019:
-            raise ValueError("令和は2019年以降の年です。")
-        reiwa_year = year - 2018
-        return f"令和{reiwa_year}年{month}月"
-    
-    def font_template(self, start_row, end_row):
-        """
-        表の入力部分の行高さ、フォントを設定。
-        generate_excel内でfor文により各表に適用。
-        """
-        start_col = 1 # A列
-        end_col = 36 # AJ列
-        # ヘッダー部分以外
-        for row in range(start_row + 3, end_row):
-            self.ws.row_dimensions[row].height = 36.8
-            for col in range(start_col, end_col + 1):
-                cell = self.ws.cell(row=row, column=col)
-        # ヘッダー部分含む
-        for row in range(start_row, end_row):
-            for col in range(start_col, end_col + 1):
-                cell = self.ws.cell(row=row, column=col)
-                cell.font = Font(name='游ゴシック', size=14, bold=True, color='000000') # フォントの設定
-                cell.alignment = Alignment(horizontal="center", vertical="center") # 文字位置の設定
-
-        
+        return reiwa_title(year, month)
     
     def is_holiday(self, year, month, day):
         """
         各工場の休日判定。
         休日セルの色付けに使用。
         """
-        # 年と月を文字列に変換
-        year_str = str(year)
-        month_str = str(month)
-        
         # 工場ごとの休日データを取得
-        if not hasattr(self, 'holidays_data'):
-            raise AttributeError("holidays_dataがロードされていません。generate_excelを先に実行してください。")
-        
-        # 指定された年月の休日リストを取得
-        if year_str in self.holidays_data and month_str in self.holidays_data[year_str]:
-            return day in self.holidays_data[year_str][month_str]
-        return False
+        if getattr(self, 'holiday_calendar', None) is None:
+            raise AttributeError("休日データがロードされていません。generate_excelを先に実行してください。")
+        return self.holiday_calendar.is_holiday(year, month, day)
+
+    def holiday_mask(self, year, month):
+        """
+        指定された年月の休日をビットマスク（1日がbit0）でまとめて取得。
+        """
+        return self.holiday_calendar.month_mask(year, month)
 
     def save_and_open(self, output_path):
         """
-        生成したexcelの一時保存と表示。
+        生成したexcelの保存と表示。
+        同じフォルダの一時ファイルに書き込んでから置き換えるため、
+        保存に失敗しても書きかけのファイルは残らず、既存のファイルも壊れない。
         """
-        self.wb.save(output_path)
-        os.startfile(output_path)
+        with atomic_output(output_path) as temp_path:
+            self.save_workbook(temp_path)
+        self.open_output(output_path)
 
-    def generate_excel(self, title, start_date, end_date, factory, output_path):
+    def open_output(self, output_path):
+        """
+        出力したファイルを開く（open_file=Falseの場合は何もしない）。
+        """
+        if self.open_file:
+            open_file_async(output_path)
+
+    def cache_key(self, title, start_date, end_date, factory):
+        """
+        生成結果のキャッシュのキー。
+        出力の見た目に関わる入力、ZIPの圧縮レベル、休日JSONの内容、ExcelGeneratorの版から作成する
+        （キャッシュからコピーする場合は保存時の圧縮のままのため、圧縮レベルが違えば別のキャッシュにする）。
+        """
+        from data.workbook_cache import cache_key
+        return cache_key(
+            version=GENERATOR_VERSION,
+            title=title,
+            start=start_date.strftime('%Y/%m'),
+            end=end_date.strftime('%Y/%m'),
+            factory=factory,
+            holidays=get_holiday_digest(factory),
+            sparse=self.sparse,
+            shallow_formulas=self.shallow_formulas,
+            cached_values=self.cached_values,
+            compress_level=self.compress_level,
+        )
+
+    def workbook_cache_key(self, schedules, titles, chained=False):
+        """
+        複数のシートをまとめたワークブックのキャッシュのキー（1シートの場合はcache_keyと同じ）。
+        """
+        from data.workbook_cache import cache_key
+        if len(schedules) == 1 and titles[0] == SHEET_TITLE:
+            schedule = schedules[0]
+            return self.cache_key(schedule.title, schedule.start_date, schedule.end_date, schedule.factory)
+        return cache_key(
+            version=GENERATOR_VERSION,
+            sheets=[{
+                'sheet_title': sheet_title,
+                'title': schedule.title,
+                'start': schedule.start_date.strftime('%Y/%m'),
+                'end': schedule.end_date.strftime('%Y/%m'),
+                'factory': schedule.factory,
+                'holidays': get_holiday_digest(schedule.factory),
+            } for schedule, sheet_title in zip(schedules, titles)],
+            chained=chained,
+            sparse=self.sparse,
+            shallow_formulas=self.shallow_formulas,
+            cached_values=self.cached_values,
+            compress_level=self.compress_level,
+        )
+
+    def save_workbook(self, path):
+        """
+        書き出しバックエンドで保存。
+        """
+        self.writer.save(path)
+
+    def generate_excel(self, title, start_date, end_date, factory, output_path, progress=None, cancel_event=None):
         """
         excelの生成。
+        エラーは呼び出し元に例外として送出する（画面表示は呼び出し元で行う）。
+        progress: 各月の表を作成するたびに progress(作成済みの月数, 全体の月数) を呼び出す。
+        cancel_event: threading.Eventなど。セットされると月の区切りでGenerationCancelledを送出し、
+                      ファイルは保存しない。
+        計測結果（GenerationProfile）を返す。計測しない場合は空の結果になる。
+        """
+        if self.split is not None:
+            schedules = split_schedule(title, start_date, end_date, factory, self.split)
+            return self.generate_workbook(schedules, output_path, progress, cancel_event, chained=True)
+        schedule = Schedule(title, start_date, end_date, factory, SHEET_TITLE)
+        return self.generate_workbook([schedule], output_path, progress, cancel_event)
+
+    def generate_workbook(self, schedules, output_path, progress=None, cancel_event=None, chained=False):
         """
+        複数の工程表（Scheduleのリスト）を1つのワークブックの別々のシートとして生成。
+        スタイル、休日データ、各月の表の組み立て結果はシート間で共有し、保存は1回だけ行う。
+        progressの月数は全シートの合計。それ以外はgenerate_excelと同じ。
+        backend、streamingを指定しない場合、書き出しバックエンドと書き込み専用モードは全シートの合計月数で
+        選ぶため、各シートを別々に生成する場合とは異なるモード（'xml'など）になることがある。
+        chained: Trueの場合、各シートの残り数量を前のシートから引き継ぐ（1つの工程表を年ごとに分けた場合）。
+                 'xml'バックエンドでworkersが2以上の場合は、2つ目以降のシートを並列に組み立てる
+                 （合計月数がparallel_min_months以上の場合）。
+        """
+        schedules = [Schedule(*schedule) for schedule in schedules]
+        if not schedules:
+            raise ValueError("工程表が指定されていません。")
+        if self.profile_mode is None:
+            self.profile = GenerationProfile.from_env()
+        else:
+            self.profile = GenerationProfile(enabled=self.profile_mode)
+        self.writer = None
+        self.profile.start()
         try:
-            # 休日データのロード
-            holidays_file = os.path.join(os.path.dirname(__file__), 'holidays', f'{factory}.json')
-            if not os.path.exists(holidays_file):
-                raise FileNotFoundError(f"工場 '{factory}' の休日JSONファイルが見つかりません。")
-            
-            with open(holidays_file, 'r', encoding='utf-8') as f:
-                self.holidays_data = json.load(f)
-            
-            # セル幅の設定
-            self.ws.sheet_view.zoomScale = 55
-            self.ws.column_dimensions['A'].width = 25
-            self.ws.column_dimensions['B'].width = 30
-            for col in range(3, 38): # C列~AL列まで
-                self.ws.column_dimensions[openpyxl.utils.get_column_letter(col)].width = 6
-
-            # 作成日を入力
-            now = datetime.now()
-            current_date_str = now.strftime('%Y/%m/%d')
-            self.ws.merge_cells(start_row=1, start_column=31, end_row=1, end_column=36) # セル結合(AE1:AJ1)
-            self.ws.row_dimensions[1].height = 32.5
-            self.ws['AE1'].value = current_date_str
-            self.ws['AE1'].font = Font(name='游ゴシック', size=20, bold=True, color='000000')
-            self.ws['AE1'].alignment = Alignment(horizontal="right")
-
-            # タイトルを入力
-            self.ws.merge_cells(start_row=3, start_column=1, end_row=3, end_column=36) # セル結合(A3:AJ3)
-            self.ws.row_dimensions[3].height = 58.5
-            self.ws['A3'].value = f"{title} 製造工程計画"
-            self.ws['A3'].font = Font(name='游ゴシック', size=36, bold=True, color='000000')
-            self.ws['A3'].alignment = Alignment(horizontal="center")
-
-            # 定型コメントを入力
-            self.ws.row_dimensions[4].height = 32.5
-            self.ws['A4'].value = "※以下の日程は生コン打設となります。"
-            self.ws['A4'].font = Font(name='游ゴシック', size=20, bold=True, color='000000')
-            self.ws['AJ4'].value = "ベルテクス株式会社"
-            self.ws['AJ4'].font = Font(name='游ゴシック', size=20, bold=True, color='000000')
-            self.ws['AJ4'].alignment = Alignment(horizontal="right")
-
-            # テーブルの開始位置
-            first_table_start_row = 9
-            contents_rows = 8  # 項目の数
-            rows_per_table = contents_rows + 5
-
-            # 現在の行を初期化
-            current_row = first_table_start_row
-
-            # 開始年月から終了年月までループ
-            year = start_date.year
-            month = start_date.month
-            end_year = end_date.year
-            end_month = end_date.month
-            
-            # 各月の表ループ
-            while (year < end_year) or (year == end_year and month <= end_month):
-                # 各表のヘッダー部分作成
-                self.ws.merge_cells(start_row=current_row, start_column=1, end_row=current_row + 2, end_column=1) # セル結合(項目)
-                items_cell = self.ws.cell(row=current_row, column=1, value="項目")
-                self.ws.merge_cells(start_row=current_row, start_column=2, end_row=current_row + 2, end_column=2) # セル結合(規格)
-                standards_cell = self.ws.cell(row=current_row, column=2, value="規格")
-                self.ws.merge_cells(start_row=current_row, start_column=3, end_row=current_row + 2, end_column=3) # セル結合(受注)
-                orders_cell = self.ws.cell(row=current_row, column=3, value="受注")
-                self.ws.merge_cells(start_row=current_row, start_column=35, end_row=current_row + 1, end_column=36) # セル結合(合計)
-                sums_cell = self.ws.cell(row=current_row, column=35, value="合計")
-                volumes_cell = self.ws.cell(row=current_row + 2, column=35, value="数量")
-                remains_cell = self.ws.cell(row=current_row + 2, column=36, value="残り")
-
-                # 初期値、数式の設定
-                for row_offset in range(3, contents_rows + 3):
-                    cell_row = current_row + row_offset
-                    self.ws.cell(row=cell_row, column=3, value="0") # 受注初期値＝０
-                    self.ws.cell(row=cell_row, column=35, value=f"=SUM(D{cell_row}:AH{cell_row})") # 合計数量の算出
-                for row_offset in range(3, contents_rows + 3): # 残り数量の算出
-                    cell_row = current_row + row_offset
-                    if current_row == first_table_start_row: # 1つ目とそれ以降で計算を変更
-                        self.ws.cell(row=cell_row, column=36, value=f"=C{str(cell_row)}-AI{str(cell_row)}")
+            self.build_and_save(schedules, output_path, progress, cancel_event, chained)
+        finally:
+            self.profile.stop()
+            if self.writer is not None:
+                self.writer.close()
+        self.profile.write_outputs(title=', '.join(schedule.title for schedule in schedules),
+                                   factory=', '.join(schedule.factory for schedule in schedules),
+                                   output_path=output_path)
+        return self.profile
+
+    def build_and_save(self, schedules, output_path, progress, cancel_event, chained=False):
+        """
+        generate_workbookの本体（計測の開始・終了はgenerate_workbookで行う）。
+        シートごとの構成（ScheduleLayout）を組み立て、書き出しバックエンドに渡す。
+        """
+        profile = self.profile
+        month_counts = [month_span(schedule.start_date, schedule.end_date) for schedule in schedules]
+        total_months = sum(month_counts)
+
+        # 休日データのロード
+        # 同じ工場のデータはプロセス内で共有し、ファイルが更新された場合だけ読み直す
+        with profile.span('holidays'):
+            calendars = [get_holiday_calendar(schedule.factory) for schedule in schedules]
+
+        # シート名（重複や使えない文字を避ける）とスパース出力の休日の一覧のシート名
+        titles = sheet_titles(schedule.sheet_title or schedule.title for schedule in schedules)
+        flag_titles = sheet_titles([HOLIDAY_FLAG_SHEET] * len(schedules), reserved=titles)
+
+        # 残り数量を引き継ぐ前のシート（シート名, 月数）
+        carries = [None] * len(schedules)
+        if chained:
+            carries[1:] = list(zip(titles, month_counts))[:-1]
+
+        # 作成日、シートの構成、書き出しバックエンド（列幅などのシートの設定を含む）
+        current_date_str = datetime.now().strftime('%Y/%m/%d')
+
+        # 同じ入力で生成済みならキャッシュからコピー
+        self.cache_hit = False
+        if self.cache is not None:
+            with profile.span('cache'):
+                key = self.workbook_cache_key(schedules, titles, chained)
+                self.cache_hit = self.cache.fetch(key, output_path, current_date_str, self.compress_level)
+            if self.cache_hit:
+                if progress is not None:
+                    progress(total_months, total_months)
+                self.open_output(output_path)
+                return
+
+        # 各月の表のテンプレートと組み立て結果はシート間で共有
+        # （同じ位置の同じ年月で休日も同じなら、表の内容は工事名や工場によらず同じ）
+        # 残り数量を引き継ぐ場合は、シートごとに年月が異なるため組み立て結果は共有しない
+        template = shared_template()
+        blocks = {} if len(schedules) > 1 and not chained else None
+        if chained and len(schedules) > 1 and self.resolve_backend(total_months) == 'xml' \
+                and self.worker_count(month_counts[1:]) > 1:
+            self.write_sheets_parallel(schedules, titles, flag_titles, carries, current_date_str, template,
+                                       month_counts, progress, cancel_event)
+        else:
+            months_done = 0
+            for schedule, calendar, sheet_title, flag_title, carry_from in zip(
+                    schedules, calendars, titles, flag_titles, carries):
+                self.holiday_calendar = calendar
+                with profile.span('page_setup'):
+                    self.layout = self.sheet_layout(schedule, current_date_str, sheet_title, flag_title,
+                                                    template, carry_from)
+                    if self.writer is None:
+                        self.writer = self.create_writer(self.layout, total_months)
                     else:
-                        self.ws.cell(row=cell_row, column=36, value=f"=AJ{str(cell_row - rows_per_table)}-AI{str(cell_row)}")
-                
-                # 全体に点線
-                bold_side = Side(style='medium', color='000000') # 太線
-                thin_side = Side(style='thin', color='000000') # 細線
-                dashed_side = Side(style='hair', color='000000') # 薄い点線
-                for row in range(current_row + 3, current_row + rows_per_table - 2):
-                    for col in range(4, 35):
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=dashed_side, bottom=dashed_side, right=dashed_side, left=dashed_side)
-                    for col in [1]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=dashed_side, bottom=dashed_side, right=thin_side, left=bold_side)
-                    for col in [2,3]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=dashed_side, bottom=dashed_side, right=thin_side, left=thin_side)
-                    for col in [35]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=dashed_side, bottom=dashed_side, right=thin_side, left=bold_side)
-                    for col in [36]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=dashed_side, bottom=dashed_side, right=bold_side, left=thin_side)
-                for row in [current_row]:
-                    for col in range(4, 35):
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=bold_side, bottom=thin_side)
-                for row in [current_row + 1]:
-                    for col in range(4, 35):
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=thin_side, bottom=dashed_side, right=dashed_side, left=dashed_side)
-                for row in [current_row + 2]:
-                    for col in range(4, 35):
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=dashed_side, bottom=bold_side, right=dashed_side, left=dashed_side)
-                for row in range(current_row, current_row + 3):
-                    for col in [1, 2, 3]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=bold_side, bottom=bold_side, right=bold_side, left=bold_side)
-                for row in range(current_row, current_row + 2):
-                    for col in [35, 36]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=bold_side, bottom=thin_side, right=bold_side, left=bold_side)
-                for row in [current_row + 2]:
-                    for col in [35]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=thin_side, bottom=bold_side, right=thin_side, left=bold_side)
-                    for col in [36]:
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=thin_side, bottom=bold_side, right=bold_side, left=thin_side)
-                for row in [current_row + rows_per_table - 2]:
-                    for col in range(1, 37):
-                        cell = self.ws.cell(row=row, column=col)
-                        cell.border = Border(top=bold_side)
-
-
-                # 月のタイトルを入力
-                reiwa_month = self.gregorian_to_reiwa(year, month)
-                self.ws.merge_cells(start_row=current_row, start_column=4, end_row=current_row, end_column=34) # セル結合
-                self.ws.row_dimensions[current_row].height = 32.5
-                title_cell = self.ws.cell(row=current_row, column=4, value=reiwa_month)
-
-                # 月の日数を取得
-                last_day = calendar.monthrange(year, month)[1]
-
-                # 日にちを入力
-                self.ws.row_dimensions[current_row + 1].height = 23
-                for day in range(1, last_day + 1):
-                    col = 4 + day - 1  # D列は4
-                    cell = self.ws.cell(row=current_row + 1, column=col, value=day)
-                
-                # 曜日を入力
-                self.ws.row_dimensions[current_row + 2].height = 23
-                for day in range(1, last_day + 1):
-                    date = datetime(year, month, day)
-                    weekday_en = date.strftime('%a')  # 'Mon', 'Tue', etc.
-                    # 英語の曜日を日本語にマッピング
-                    weekday_jp = {
-                        'Mon': '月',
-                        'Tue': '火',
-                        'Wed': '水',
-                        'Thu': '木',
-                        'Fri': '金',
-                        'Sat': '土',
-                        'Sun': '日'
-                    }.get(weekday_en, '')
-                    col = 4 + day - 1
-                    self.ws.cell(row=current_row + 2, column=col, value=weekday_jp)
-
-                # フォントの適用
-                self.font_template(current_row, current_row + rows_per_table - 2)
-                title_cell.font = Font(name='游ゴシック', size=20, bold=True, color='000000')
-
-                # 休日のセルに色を付ける（楯列すべて）
-                for day in range(1, last_day + 1):
-                    if self.is_holiday(year, month, day):
-                        col = 4 + day - 1
-                        for row_offset in range(1, rows_per_table - 2):
-                            cell_row = current_row + row_offset
-                            cell = self.ws.cell(row=cell_row, column=col)
-                            cell.font = Font(name='游ゴシック', size=14, bold=True, color='ff0000')
-                            cell.fill = PatternFill(fill_type='solid', fgColor='ffc7ce')
-
-                # 次の月のテーブル開始行を更新
-                current_row += rows_per_table
-
-                # 月をインクリメント
-                if month == 12:
-                    year += 1
-                    month = 1
-                else:
-                    month += 1
-
-        except Exception as e:
-            messagebox.showerror("エラー", f"製造工程表の生成中にエラーが発生しました。\n{e}")
+                        self.writer.add_sheet(self.layout)
+                months_done = self.write_sheet(schedule, blocks, months_done, total_months, progress, cancel_event)
 
         # 保存して開く
-        self.save_and_open(output_path)
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled("製造工程表の生成がキャンセルされました。")
+        with profile.span('save'):
+            self.save_and_open(output_path)
+
+        # 次回以降のためにキャッシュに追加（失敗しても生成は成功として扱う）
+        if self.cache is not None:
+            with profile.span('cache'):
+                try:
+                    self.cache.store(key, output_path, current_date_str)
+                except OSError as e:
+                    print(f"キャッシュに保存できませんでした: {e}")
+
+    def sheet_layout(self, schedule, current_date_str, sheet_title, flag_title, template=None, carry_from=None):
+        """1シート分の構成（ScheduleLayout）"""
+        return ScheduleLayout(schedule.title, current_date_str, sparse=self.sparse,
+                              sheet_title=sheet_title, flag_sheet_title=flag_title,
+                              template=template, shallow_formulas=self.shallow_formulas,
+                              cached_values=self.cached_values, carry_from=carry_from)
+
+    def worker_count(self, month_counts):
+        """
+        並列に組み立てるシート（各シートの月数）に対するワーカープロセスの数。
+        合計月数がparallel_min_months未満の場合は1（順に組み立てる）。
+        """
+        if sum(month_counts) < self.parallel_min_months:
+            return 1
+        return min(self.workers, len(month_counts))
+
+    def write_sheets_parallel(self, schedules, titles, flag_titles, carries, current_date_str, template,
+                              month_counts, progress, cancel_event):
+        """
+        2つ目以降のシートをワーカープロセスで並列に組み立て（render_sheet）、その間に1つ目のシートを
+        このプロセスで書き出す。組み立て済みのシートは元の順にwriterへ追加する。
+        2つ目以降のシートの進捗は、シートの組み立てが終わるたびにまとめて通知する。
+        """
+        profile = self.profile
+        total_months = sum(month_counts)
+        with profile.span('page_setup'):
+            self.holiday_calendar = get_holiday_calendar(schedules[0].factory)
+            self.layout = self.sheet_layout(schedules[0], current_date_str, titles[0], flag_titles[0], template)
+            self.writer = self.create_writer(self.layout, total_months)
+
+        options = {'sparse': self.sparse, 'shallow_formulas': self.shallow_formulas,
+                   'cached_values': self.cached_values}
+        jobs = [(options, schedule, sheet_title, flag_title, carry_from, current_date_str)
+                for schedule, sheet_title, flag_title, carry_from
+                in list(zip(schedules, titles, flag_titles, carries))[1:]]
+        executor = ProcessPoolExecutor(max_workers=self.worker_count(month_counts[1:]))
+        try:
+            futures = [executor.submit(render_sheet, job) for job in jobs]
+            months_done = self.write_sheet(schedules[0], None, 0, total_months, progress, cancel_event)
+            with profile.span('parallel'):
+                for future, month_count in zip(futures, month_counts[1:]):
+                    while True:
+                        if cancel_event is not None and cancel_event.is_set():
+                            raise GenerationCancelled("製造工程表の生成がキャンセルされました。")
+                        try:
+                            sheets = future.result(timeout=CANCEL_POLL_SECONDS)
+                            break
+                        except FutureTimeout:
+                            continue
+                    self.writer.add_rendered_sheets(sheets)
+                    months_done += month_count
+                    if progress is not None:
+                        progress(months_done, total_months)
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+    def render_sheet(self, schedule, sheet_title, flag_title, carry_from, created_date_str):
+        """
+        1つの工程表を'xml'バックエンドのシートのXMLまで組み立て、RenderedSheetのリストで返す
+        （スパース出力では休日の一覧のシートを含む）。並列の生成でワーカープロセスから呼び出す。
+        """
+        self.holiday_calendar = get_holiday_calendar(schedule.factory)
+        self.layout = self.sheet_layout(schedule, created_date_str, sheet_title, flag_title, carry_from=carry_from)
+        self.writer = XmlWriter(self.layout, compress_level=self.compress_level)
+        try:
+            month_count = month_span(schedule.start_date, schedule.end_date)
+            self.write_sheet(schedule, None, 0, month_count, None, None)
+            return [sheet.rendered(self.writer.xf_ids, self.writer.dxf_ids) for sheet in self.writer.sheets]
+        finally:
+            self.writer.close()
+
+    def write_sheet(self, schedule, blocks, months_done, total_months, progress, cancel_event):
+        """
+        現在のシート（self.layout）に1つの工程表を書き出し、全シートでの作成済みの月数を返す。
+        blocks: シート間で共有する各月の表の組み立て結果（共有しない場合はNone）。
+        """
+        profile = self.profile
+
+        # シート上部（作成日、タイトル、定型コメント）
+        with profile.span('header'):
+            self.writer.write_block(self.layout.header_block())
+            profile.add_cells(4)
+
+        # 開始年月から終了年月までの各月の表ループ
+        months = month_range(schedule.start_date, schedule.end_date)
+        holiday_masks = []
+        cells_per_month = self.layout.cells_per_month()
+        for index, number in enumerate(months):
+            year, month = year_month(number)
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("製造工程表の生成がキャンセルされました。")
+
+            profile.begin_month(year, month)
+            mask = self.holiday_mask(year, month)
+            if self.sparse:
+                holiday_masks.append(mask)
+            with profile.span('template'):
+                block = blocks.get((index, year, month, mask)) if blocks is not None else None
+                if block is None:
+                    block = self.layout.month_block(index, year, month, self.gregorian_to_reiwa(year, month), mask)
+                    if blocks is not None:
+                        blocks[(index, year, month, mask)] = block
+            with profile.span('cells'):
+                self.writer.write_block(block)
+            profile.add_cells(cells_per_month)
+            profile.end_month()
+
+            # 進捗の通知
+            months_done += 1
+            if progress is not None:
+                progress(months_done, total_months)
+
+        # スパース出力では休日の一覧と条件付き書式を追加
+        if self.sparse:
+            with profile.span('holiday_format'):
+                self.writer.write_holiday_flags(self.layout.holiday_flag_rows(holiday_masks))
+                self.writer.add_conditional_formats(self.layout.conditional_formats(len(months)))
+        return months_done
+
+    def extend_excel(self, source_path, end_date, factory, output_path=None, progress=None, cancel_event=None):
+        """
+        生成済みの工程表の最後の月の表の後ろに、end_dateまでの月の表を追加（期間の延長）。
+        入力済みの数量や受注などの既存の内容は変更せず、追加した月の「残り」は最後の表から続く数式になる。
+        output_path: 保存先。省略した場合は元のファイルを置き換える。
+        progress、cancel_eventはgenerate_excelと同じ（月数は追加する月数）。
+        追加した月数を返す。
+        """
+        output_path = output_path or source_path
+        self.holiday_calendar = get_holiday_calendar(factory)
+        layout = ScheduleLayout('', '', contents_rows=8)
+        extender = WorkbookExtender(source_path, layout, compress_level=self.compress_level)
+        try:
+            extender.open()
+            first = month_index(extender.last_year, extender.last_month) + 1
+            added = date_index(end_date) - first + 1
+            if added < 1:
+                raise ValueError(f"終了年月が既存の最後の月（{extender.last_year}/{extender.last_month:02d}）以前です。")
+
+            for done, number in enumerate(range(first, first + added)):
+                if cancel_event is not None and cancel_event.is_set():
+                    raise GenerationCancelled("製造工程表の延長がキャンセルされました。")
+                year, month = year_month(number)
+                block = layout.month_block(extender.last_index + 1 + done, year, month,
+                                           self.gregorian_to_reiwa(year, month), self.holiday_mask(year, month))
+                extender.write_block(block)
+                if progress is not None:
+                    progress(done + 1, added)
+
+            if cancel_event is not None and cancel_event.is_set():
+                raise GenerationCancelled("製造工程表の延長がキャンセルされました。")
+            # 元のファイルを置き換えられるよう、閉じてから置き換える
+            with atomic_output(output_path) as temp_path:
+                extender.save(temp_path)
+                extender.close()
+        finally:
+            extender.close()
+        self.open_output(output_path)
+        return added
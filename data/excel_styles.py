@@ -0,0 +1,111 @@
+# data/excel_styles.py
+from copy import copy
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.styles.differential import DifferentialStyle
+
+FONT_NAME = '游ゴシック'
+
+
+class StyleRegistry:
+    """
+    工程表で使用するセルスタイルの登録簿。
+    ワークブックごとに一度だけNamedStyleを生成し、各セルには名前で適用する。
+    """
+    def __init__(self, wb):
+        self.wb = wb
+        self.arrays = {} # スタイル名 -> 登録済みのStyleArray
+
+        # 罫線
+        bold_side = Side(style='medium', color='000000') # 太線
+        thin_side = Side(style='thin', color='000000') # 細線
+        dashed_side = Side(style='hair', color='000000') # 薄い点線
+
+        # フォント
+        body_font = Font(name=FONT_NAME, size=14, bold=True, color='000000')
+        holiday_font = Font(name=FONT_NAME, size=14, bold=True, color='ff0000')
+        large_font = Font(name=FONT_NAME, size=20, bold=True, color='000000')
+        title_font = Font(name=FONT_NAME, size=36, bold=True, color='000000')
+
+        # 文字位置、塗りつぶし
+        center = Alignment(horizontal="center", vertical="center")
+        holiday_fill = PatternFill(fill_type='solid', fgColor='ffc7ce')
+
+        # シート上部（作成日、タイトル、定型コメント）
+        self._register('date', font=large_font, alignment=Alignment(horizontal="right"))
+        self._register('sheet_title', font=title_font, alignment=Alignment(horizontal="center"))
+        self._register('comment', font=large_font)
+        self._register('company', font=large_font, alignment=Alignment(horizontal="right"))
+
+        # 各表のヘッダー部分
+        self._register('month_title', font=large_font, alignment=center,
+                       border=Border(top=bold_side, bottom=thin_side))
+        self._register('title_row', font=body_font, alignment=center,
+                       border=Border(top=bold_side, bottom=thin_side))
+        self._register('header', font=body_font, alignment=center,
+                       border=Border(top=bold_side, bottom=bold_side, right=bold_side, left=bold_side))
+        self._register('sum_header', font=body_font, alignment=center,
+                       border=Border(top=bold_side, bottom=thin_side, right=bold_side, left=bold_side))
+        self._register('volume_header', font=body_font, alignment=center,
+                       border=Border(top=thin_side, bottom=bold_side, right=thin_side, left=bold_side))
+        self._register('remain_header', font=body_font, alignment=center,
+                       border=Border(top=thin_side, bottom=bold_side, right=bold_side, left=thin_side))
+
+        # 日にち、曜日、入力部分（休日は文字色と塗りつぶしを変えた版も登録）
+        day_border = Border(top=thin_side, bottom=dashed_side, right=dashed_side, left=dashed_side)
+        weekday_border = Border(top=dashed_side, bottom=bold_side, right=dashed_side, left=dashed_side)
+        body_border = Border(top=dashed_side, bottom=dashed_side, right=dashed_side, left=dashed_side)
+        for name, border in (('day', day_border), ('weekday', weekday_border), ('body', body_border)):
+            self._register(name, font=body_font, alignment=center, border=border)
+            self._register(self.holiday(name), font=holiday_font, alignment=center, border=border,
+                           fill=holiday_fill)
+
+        # 入力部分の左右の列
+        self._register('item', font=body_font, alignment=center,
+                       border=Border(top=dashed_side, bottom=dashed_side, right=thin_side, left=bold_side))
+        self._register('spec', font=body_font, alignment=center,
+                       border=Border(top=dashed_side, bottom=dashed_side, right=thin_side, left=thin_side))
+        self._register('sum', font=body_font, alignment=center,
+                       border=Border(top=dashed_side, bottom=dashed_side, right=thin_side, left=bold_side))
+        self._register('remain', font=body_font, alignment=center,
+                       border=Border(top=dashed_side, bottom=dashed_side, right=bold_side, left=thin_side))
+
+        # 表の下端
+        self._register('table_bottom', border=Border(top=bold_side))
+
+        # スパース出力用：列の既定の書式と、条件付き書式で使う差分スタイル
+        self._register('column_default', font=body_font, alignment=center)
+        self.differential = {
+            # 条件付き書式の塗りつぶしは背景色（bgColor）で指定する
+            'holiday': DifferentialStyle(font=Font(color='ff0000'),
+                                         fill=PatternFill(fill_type='solid', fgColor='ffc7ce', bgColor='ffc7ce')),
+            'body_grid': DifferentialStyle(border=body_border),
+        }
+
+    def _register(self, name, font=None, alignment=None, border=None, fill=None):
+        """
+        NamedStyleを生成してワークブックに登録。
+        """
+        style = NamedStyle(name=name, font=font or DEFAULT_FONT)
+        if alignment is not None:
+            style.alignment = alignment
+        if border is not None:
+            style.border = border
+        if fill is not None:
+            style.fill = fill
+        self.wb.add_named_style(style)
+        self.arrays[name] = style.as_tuple()
+
+    def apply(self, cell, name):
+        """
+        セルにスタイルを適用。
+        cell.style = name と同じ結果になるが、スタイル名の検索を省略する。
+        """
+        cell._style = copy(self.arrays[name])
+
+    @staticmethod
+    def holiday(name):
+        """
+        休日用スタイルの名前を取得。
+        """
+        return f"{name}_holiday"
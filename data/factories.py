@@ -0,0 +1,11 @@
+# data/factories.py
+
+# 工場名（画面表示用）と休日データ（data/holidays/*.json）の識別子の対応
+FACTORIES_MAPPING = {
+    '結城': 'kihon',
+    '熊谷': 'kihon',
+    '静岡': 'kihon',
+    '京都': 'kihon',
+    '千葉': 'chiba',
+    '富山': 'kihon'
+}
@@ -0,0 +1,146 @@
+# data/generation_profile.py
+"""
+工程表生成の計測（フェーズごとの処理時間、月ごとの内訳、書き込んだセル数）。
+
+環境変数:
+    WORK_SCHEDULER_PROFILE=1         フェーズごとの時間を計測
+    WORK_SCHEDULER_PROFILE=cprofile  計測に加えてcProfileの結果を保存
+    WORK_SCHEDULER_PROFILE_LOG       計測結果を1行のJSONとして追記するファイル
+    WORK_SCHEDULER_PROFILE_STATS     cProfileの結果の保存先（省略時は一時フォルダ）
+"""
+from contextlib import nullcontext
+from datetime import datetime
+import json
+import os
+import tempfile
+import time
+
+PROFILE_ENV = 'WORK_SCHEDULER_PROFILE'
+PROFILE_LOG_ENV = 'WORK_SCHEDULER_PROFILE_LOG'
+PROFILE_STATS_ENV = 'WORK_SCHEDULER_PROFILE_STATS'
+
+# 計測しない場合に使い回す何もしないコンテキスト
+_NULL_SPAN = nullcontext()
+
+
+class _Span:
+    """1つのフェーズの時間を計測し、全体と現在の月に加算する"""
+    __slots__ = ('profile', 'name', 'started')
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profile.add_time(self.name, time.perf_counter() - self.started)
+
+
+class GenerationProfile:
+    """
+    generate_excelの計測結果。
+    enabledがFalseの場合、spanは何もしないコンテキストを返し、記録も行わない。
+    """
+    def __init__(self, enabled=False, use_cprofile=False, log_path=None, stats_path=None):
+        self.enabled = enabled or use_cprofile
+        self.use_cprofile = use_cprofile
+        self.log_path = log_path
+        self.stats_path = stats_path
+        self.phases = {}
+        self.months = []
+        self.current_month = None
+        self.cell_count = 0
+        self.total_seconds = None
+        self.profiler = None
+        self.started = None
+
+    @classmethod
+    def from_env(cls):
+        """環境変数の設定から生成（未設定なら計測しない）"""
+        mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+        if mode in ('', '0', 'false', 'off'):
+            return cls()
+        return cls(enabled=True, use_cprofile=(mode == 'cprofile'),
+                   log_path=os.environ.get(PROFILE_LOG_ENV) or None,
+                   stats_path=os.environ.get(PROFILE_STATS_ENV) or None)
+
+    def start(self):
+        """計測を開始"""
+        if not self.enabled:
+            return
+        if self.use_cprofile:
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        self.started = time.perf_counter()
+
+    def stop(self):
+        """計測を終了（例外で中断した場合も呼び出す）"""
+        if not self.enabled or self.started is None:
+            return
+        self.total_seconds = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+
+    def span(self, name):
+        """with文で囲んだ処理の時間をnameのフェーズに加算"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def add_time(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if self.current_month is not None:
+            self.current_month['phases'][name] = self.current_month['phases'].get(name, 0.0) + seconds
+
+    def begin_month(self, year, month):
+        """以降のフェーズを指定した月の内訳として記録"""
+        if not self.enabled:
+            return
+        self.current_month = {'year': year, 'month': month, 'phases': {}, 'cells': 0}
+        self.months.append(self.current_month)
+
+    def end_month(self):
+        self.current_month = None
+
+    def add_cells(self, count):
+        """書き込んだセル数を加算"""
+        if not self.enabled:
+            return
+        self.cell_count += count
+        if self.current_month is not None:
+            self.current_month['cells'] += count
+
+    def report(self):
+        """計測結果を辞書で取得"""
+        return {
+            'total_seconds': round(self.total_seconds or 0.0, 6),
+            'phases': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+            'cell_count': self.cell_count,
+            'months': [
+                {'year': item['year'], 'month': item['month'], 'cells': item['cells'],
+                 'phases': {name: round(seconds, 6) for name, seconds in item['phases'].items()}}
+                for item in self.months
+            ],
+        }
+
+    def write_outputs(self, **context):
+        """
+        JSONログとcProfileの結果を保存。
+        contextはJSONログの行に追加する情報（工場、出力先など）。
+        """
+        if not self.enabled:
+            return
+        if self.profiler is not None:
+            if self.stats_path is None:
+                stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+                self.stats_path = os.path.join(tempfile.gettempdir(), f"work-scheduler_{stamp}.prof")
+            self.profiler.dump_stats(self.stats_path)
+        if self.log_path:
+            line = dict(context, created_at=datetime.now().isoformat(timespec='seconds'), **self.report())
+            if self.stats_path:
+                line['cprofile_stats'] = self.stats_path
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(line, ensure_ascii=False) + '\n')
@@ -0,0 +1,123 @@
+# data/holiday_calendar.py
+from array import array
+import json
+from data.year_month import month_index, parse_month, format_month
+
+
+def days_to_months(days_data):
+    """{"年": {"月": [日, ...]}} 形式を {月の通し番号: ビットマスク} に変換"""
+    months = {}
+    for year_str, months_data in (days_data or {}).items():
+        for month_str, days in months_data.items():
+            mask = 0
+            for day in days:
+                mask |= 1 << (day - 1)
+            months[month_index(int(year_str), int(month_str))] = mask
+    return months
+
+
+def months_to_days(months):
+    """{月の通し番号: ビットマスク} を {"年": {"月": [日, ...]}} 形式に変換（空の月は省く）"""
+    days_data = {}
+    for index in sorted(months):
+        days = [day for day in range(1, 32) if months[index] >> (day - 1) & 1]
+        if days:
+            days_data.setdefault(str(index // 12), {})[str(index % 12 + 1)] = days
+    return days_data
+
+
+class HolidayCalendar:
+    """
+    工場ごとの休日カレンダー。
+    各月の休日を1つの整数のビットマスク（1日がbit0、31日がbit30）で持ち、
+    月の通し番号で配列を直接参照するため、1日の判定も1か月分の取得も定数時間。
+    """
+    def __init__(self, first_month_index, masks):
+        self.first_month_index = first_month_index
+        self.masks = array('I', masks)
+
+    @classmethod
+    def from_months(cls, months):
+        """{月の通し番号: ビットマスク} から生成（間の月は休日なし）"""
+        if not months:
+            return cls(0, [])
+        first = min(months)
+        masks = [0] * (max(months) - first + 1)
+        for index, mask in months.items():
+            masks[index - first] = mask
+        return cls(first, masks)
+
+    @classmethod
+    def from_dict(cls, holidays_data):
+        """
+        {"年": {"月": [日, ...]}} 形式（旧形式の data/holidays/*.json）の休日データから生成。
+        """
+        return cls.from_months(days_to_months(holidays_data))
+
+    @classmethod
+    def from_compact(cls, data):
+        """
+        {"first_month": "2019/01", "masks": [ビットマスク, ...]} 形式（ベースカレンダー）から生成。
+        """
+        if not data['masks']:
+            return cls(0, [])
+        return cls(parse_month(data['first_month']), data['masks'])
+
+    def to_compact(self):
+        """from_compactの形式に変換"""
+        return {'first_month': format_month(self.first_month_index), 'masks': list(self.masks)}
+
+    def months(self):
+        """{月の通し番号: ビットマスク}"""
+        return {self.first_month_index + offset: mask for offset, mask in enumerate(self.masks)}
+
+    def with_overlay(self, holidays=None, workdays=None):
+        """
+        このカレンダーを元に、工場ごとの差分を重ねたカレンダーを作成。
+        holidays: 追加の休日（休業日）、workdays: 元の休日のうち稼働する日（出勤の土曜など）。
+        どちらも {"年": {"月": [日, ...]}} 形式。
+        """
+        months = self.months()
+        for index, mask in days_to_months(holidays).items():
+            months[index] = months.get(index, 0) | mask
+        for index, mask in days_to_months(workdays).items():
+            months[index] = months.get(index, 0) & ~mask
+        return HolidayCalendar.from_months(months)
+
+    def overlay_against(self, base):
+        """
+        baseに重ねるとこのカレンダーになる差分 (holidays, workdays) を作成（with_overlayの逆）。
+        このカレンダーの範囲外の月はbaseのままとする。
+        """
+        base_months = base.months()
+        holidays, workdays = {}, {}
+        for index, mask in self.months().items():
+            base_mask = base_months.get(index, 0)
+            holidays[index] = mask & ~base_mask
+            workdays[index] = base_mask & ~mask
+        return months_to_days(holidays), months_to_days(workdays)
+
+    @classmethod
+    def load(cls, path):
+        """休日JSONファイルから生成"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def month_mask(self, year, month):
+        """
+        指定された年月の休日のビットマスクを取得。
+        データの範囲外の月は休日なし（0）とする。
+        """
+        offset = month_index(year, month) - self.first_month_index
+        if 0 <= offset < len(self.masks):
+            return self.masks[offset]
+        return 0
+
+    def is_holiday(self, year, month, day):
+        """指定された日が休日かどうか"""
+        return bool(self.month_mask(year, month) >> (day - 1) & 1)
+
+    def month_holidays(self, year, month):
+        """指定された年月の休日（日にち）のリスト"""
+        mask = self.month_mask(year, month)
+        return [day for day in range(1, 32) if mask >> (day - 1) & 1]
@@ -0,0 +1,187 @@
+# data/holiday_store.py
+"""
+工場ごとの休日カレンダーをプロセス内で共有するキャッシュ。
+
+休日データは、全工場で共通のベースカレンダー（data/holidays/base/{name}.json、各月の休日のビットマスク）と、
+工場ごとの差分（data/holidays/{factory}.json、追加の休業日と稼働する休日）を重ね合わせて作る。
+差分のファイルの形式:
+    {"base": "japan", "holidays": {"年": {"月": [日, ...]}}, "workdays": {"年": {"月": [日, ...]}}}
+旧形式（{"年": {"月": [日, ...]}} ですべての休日を持つファイル）もそのまま読み込める。
+
+一度読み込んだカレンダーはExcelGeneratorのインスタンスをまたいで再利用し、
+差分またはベースのファイルの更新日時かサイズが変わった場合だけ内容のハッシュを確認して読み直す。
+差分と同じ場所に事前コンパイル済みのバイナリ（{factory}.bin）があり、
+両方のファイルのハッシュと一致する場合はベースを解析せずにバイナリから配列をそのまま読み込む。
+"""
+from array import array
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+
+from data.holiday_calendar import HolidayCalendar
+
+HOLIDAYS_DIR = os.path.join(os.path.dirname(__file__), 'holidays')
+
+# ベースカレンダーを置くディレクトリ（HOLIDAYS_DIRの下）と既定のベースカレンダー
+BASE_DIR_NAME = 'base'
+DEFAULT_BASE = 'japan'
+
+# バイナリのヘッダー（識別子, 最初の月の通し番号, 月数, 元のJSON（とベース）のSHA-256）
+SIDECAR_MAGIC = b'HCAL0001'
+SIDECAR_HEADER = struct.Struct('<8sii32s')
+
+_cache = {} # JSONのパス -> (更新日時とサイズ, JSONのハッシュ, カレンダー, 読み込んだファイルのパス)
+_lock = threading.Lock()
+
+
+def holidays_path(factory, holidays_dir=None):
+    """工場の休日JSONファイルのパス"""
+    return os.path.join(holidays_dir or HOLIDAYS_DIR, f'{factory}.json')
+
+
+def sidecar_path(json_path):
+    """休日JSONに対応するバイナリのパス"""
+    return os.path.splitext(json_path)[0] + '.bin'
+
+
+def get_holiday_calendar(factory, holidays_dir=None):
+    """
+    工場の休日カレンダーを取得（キャッシュ済みならそれを返す）。
+    """
+    return load_entry(factory, holidays_dir)[2]
+
+
+def get_holiday_digest(factory, holidays_dir=None):
+    """
+    工場の休日JSON（差分の形式ならベースカレンダーも含む）の内容のSHA-256（16進数）。
+    生成結果のキャッシュのキーに使う。
+    """
+    return load_entry(factory, holidays_dir)[1].hex()
+
+
+def base_path(name, holidays_dir=None):
+    """ベースカレンダーのJSONファイルのパス"""
+    return os.path.join(holidays_dir or HOLIDAYS_DIR, BASE_DIR_NAME, f'{name}.json')
+
+
+def available_factories(holidays_dir=None):
+    """休日データのある工場の一覧"""
+    return sorted(name[:-len('.json')] for name in os.listdir(holidays_dir or HOLIDAYS_DIR)
+                  if name.endswith('.json'))
+
+
+def is_overlay(holidays_data):
+    """工場ごとの差分の形式かどうか（旧形式は年がキー）"""
+    return 'base' in holidays_data
+
+
+def file_stats(paths):
+    """ファイルの(更新日時, サイズ)の一覧"""
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(stats)
+
+
+def read_sources(path, holidays_dir=None):
+    """
+    工場の休日JSONと、差分の形式ならそのベースカレンダーを読み込む。
+    (読み込んだファイルのパス, 両方の内容のSHA-256, 工場のJSONの内容, ベースのファイルの内容)を返す。
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    holidays_data = json.loads(content.decode('utf-8'))
+    paths = [path]
+    digest = hashlib.sha256(content)
+    base_content = None
+    if is_overlay(holidays_data):
+        paths.append(base_path(holidays_data['base'], holidays_dir))
+        with open(paths[1], 'rb') as f:
+            base_content = f.read()
+        digest.update(b'\0' + base_content)
+    return paths, digest.digest(), holidays_data, base_content
+
+
+def build_calendar(holidays_data, base_content):
+    """read_sourcesで読み込んだ内容からカレンダーを作成"""
+    if not is_overlay(holidays_data):
+        return HolidayCalendar.from_dict(holidays_data)
+    base = HolidayCalendar.from_compact(json.loads(base_content.decode('utf-8')))
+    return base.with_overlay(holidays_data.get('holidays'), holidays_data.get('workdays'))
+
+
+def load_entry(factory, holidays_dir=None):
+    """
+    キャッシュの項目（更新日時とサイズ, JSONのハッシュ, カレンダー, 読み込んだファイルのパス）を取得。
+    未読み込み、またはファイルが更新された場合は読み込む。
+    """
+    path = holidays_path(factory, holidays_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"工場 '{factory}' の休日JSONファイルが見つかりません。")
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached is not None:
+            try:
+                if file_stats(cached[3]) == cached[0]:
+                    return cached
+            except OSError:
+                pass
+
+        paths, digest, holidays_data, base_content = read_sources(path, holidays_dir)
+        stat_key = file_stats(paths)
+        if cached is not None and cached[1] == digest:
+            # 更新日時だけが変わった場合は読み直さない
+            calendar = cached[2]
+        else:
+            calendar = read_sidecar(sidecar_path(path), digest)
+            if calendar is None:
+                calendar = build_calendar(holidays_data, base_content)
+        _cache[path] = (stat_key, digest, calendar, paths)
+        return _cache[path]
+
+
+def clear_cache():
+    """キャッシュを破棄（ベンチマークや休日データ更新後の再読み込み用）"""
+    with _lock:
+        _cache.clear()
+
+
+def read_sidecar(path, digest):
+    """
+    バイナリからカレンダーを読み込む。
+    存在しない、形式が違う、元のJSONと内容が一致しない場合はNone。
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < SIDECAR_HEADER.size:
+        return None
+    magic, first_month_index, count, source_digest = SIDECAR_HEADER.unpack_from(data)
+    if magic != SIDECAR_MAGIC or source_digest != digest:
+        return None
+    masks = array('I')
+    body = data[SIDECAR_HEADER.size:]
+    if masks.itemsize != 4 or len(body) != count * 4:
+        return None
+    masks.frombytes(body)
+    if sys.byteorder != 'little': # バイナリはリトルエンディアン
+        masks.byteswap()
+    return HolidayCalendar(first_month_index, masks)
+
+
+def write_sidecar(json_path, holidays_dir=None):
+    """休日JSON（差分の形式ならベースと重ね合わせた結果）からバイナリを生成"""
+    _paths, digest, holidays_data, base_content = read_sources(json_path, holidays_dir)
+    calendar = build_calendar(holidays_data, base_content)
+    with open(sidecar_path(json_path), 'wb') as f:
+        f.write(SIDECAR_HEADER.pack(SIDECAR_MAGIC, calendar.first_month_index, len(calendar.masks), digest))
+        masks = array('I', calendar.masks)
+        if sys.byteorder != 'little':
+            masks.byteswap()
+        f.write(masks.tobytes())
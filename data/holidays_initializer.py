@@ -1,74 +1,142 @@
 # data/holidays_initializer.py
 
 import os
+import sys
 import json
-from datetime import datetime, timedelta
+from datetime import datetime
 import jpholiday
 
-def initialize_holidays():
+# 直接実行（python data/holidays_initializer.py）でもdataパッケージを参照できるようにする
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data.factories import FACTORIES_MAPPING
+from data.holiday_calendar import HolidayCalendar
+from data.year_month import month_index, month_info
+from data.holiday_store import write_sidecar, base_path, is_overlay, DEFAULT_BASE
+
+
+def base_year_holidays(year):
     """
-    各工場ごとに日本の土日祝日情報をJSONファイルとして生成・更新
+    1年分の土日祝日を月ごとにまとめて計算。
+    土日は各月の最初の土曜・日曜から7日おきに取り、祝日は1年分を一度に取得する。
+    """
+    months = {}
+    for month in range(1, 13):
+        info = month_info(month_index(year, month))
+        first_weekday, last_day = info.first_weekday, info.days
+        first_saturday = (5 - first_weekday) % 7 + 1
+        first_sunday = (6 - first_weekday) % 7 + 1
+        months[month] = set(range(first_saturday, last_day + 1, 7)) | set(range(first_sunday, last_day + 1, 7))
+    for date, _name in jpholiday.year_holidays(year):
+        months[date.month].add(date.day)
+    return {str(month): sorted(days) for month, days in months.items()}
+
+
+def default_factories(holidays_dir):
+    """既存の休日JSONと工場選択で参照される識別子の一覧"""
+    factories = set(FACTORIES_MAPPING.values())
+    if os.path.exists(holidays_dir):
+        for filename in os.listdir(holidays_dir):
+            if filename.endswith('.json'):
+                factories.add(filename[:-len('.json')])
+    return sorted(factories)
+
+
+def update_base_calendar(path, years):
+    """
+    ベースカレンダーに足りない年月だけ土日祝日を追加して保存し、カレンダーを返す。
+    既に登録済みの月は変更しない。
+    """
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            months = HolidayCalendar.from_compact(json.load(f)).months()
+        changed = False
+    else:
+        months = {}
+        changed = True
+
+    for year in years:
+        missing_months = [month for month in range(1, 13) if month_index(year, month) not in months]
+        if not missing_months:
+            continue
+        year_holidays = base_year_holidays(year)
+        for month in missing_months:
+            mask = 0
+            for day in year_holidays[str(month)]:
+                mask |= 1 << (day - 1)
+            months[month_index(year, month)] = mask
+        changed = True
+
+    calendar = HolidayCalendar.from_months(months)
+    if changed:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(calendar.to_compact(), f, separators=(',', ':'))
+    return calendar
+
+
+def write_overlay(json_path, holidays=None, workdays=None):
+    """工場ごとの差分（ベースカレンダーとの違い）をJSONファイルに書き込む"""
+    overlay = {'base': DEFAULT_BASE, 'holidays': holidays or {}, 'workdays': workdays or {}}
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(overlay, f, ensure_ascii=False, indent=4)
+
+
+def initialize_holidays(factories=None):
+    """
+    日本の土日祝日のベースカレンダー（data/holidays/base/japan.json）を生成・更新し、
+    各工場の差分のJSONファイルがなければ作成する。
+    ベースカレンダーにない年月だけを追加し、既に登録済みの月は変更しない。
+    工場ごとの休業日・稼働日は差分のファイルに書くため、ベースの更新で失われない。
+    旧形式（すべての休日を持つ）の工場のファイルは、ベースとの差分の形式に変換する。
     """
-    # 工場リスト
-    factories = ['yuki', 'kihon']
-    
     # 現在の年
     current_year = datetime.now().year
-    
+
     # 生成する年の範囲（現在の5年前から20年後まで）
     start_year = current_year - 5
     end_year = current_year + 20
-    
+
     # 休日情報を格納するディレクトリのパス
     holidays_dir = os.path.join(os.path.dirname(__file__), 'holidays')
-    
+
     # ディレクトリが存在しない場合は作成
     if not os.path.exists(holidays_dir):
         os.makedirs(holidays_dir)
-    
+
+    # 工場リスト
+    if factories is None:
+        factories = default_factories(holidays_dir)
+
+    # 旧形式の工場のファイル（ベースの範囲をその年まで広げて差分に変換する）
+    legacy = {}
     for factory in factories:
-        # 各工場のJSONファイルパス
         json_path = os.path.join(holidays_dir, f"{factory}.json")
-        
-        # 既存のデータを読み込む（存在する場合）
         if os.path.exists(json_path):
             with open(json_path, 'r', encoding='utf-8') as f:
                 holidays_data = json.load(f)
-        else:
-            holidays_data = {}
-        
-        # 各年ごとに休日情報を追加
-        for year in range(start_year, end_year + 1):
-            year_str = str(year)
-            if year_str not in holidays_data:
-                holidays_data[year_str] = {}
-            
-            for month in range(1, 13):
-                month_str = str(month)
-                if month_str not in holidays_data[year_str]:
-                    holidays_data[year_str][month_str] = []
-                
-                # 月の初日と最終日を取得
-                first_day = datetime(year, month, 1)
-                if month == 12:
-                    next_month = datetime(year + 1, 1, 1)
-                else:
-                    next_month = datetime(year, month + 1, 1)
-                last_day = next_month - timedelta(days=1)
-                
-                # 月内の全日をチェック
-                for day in range(1, last_day.day + 1):
-                    date = datetime(year, month, day)
-                    if jpholiday.is_holiday(date) or date.weekday() >= 5:  # 土日祝日
-                        holidays_data[year_str][month_str].append(day)
-                
-                # 重複を排除し、ソート
-                holidays_data[year_str][month_str] = sorted(list(set(holidays_data[year_str][month_str])))
-        
-        # JSONファイルに書き込む
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(holidays_data, f, ensure_ascii=False, indent=4)
+            if not is_overlay(holidays_data):
+                legacy[factory] = holidays_data
+    years = set(range(start_year, end_year + 1))
+    for holidays_data in legacy.values():
+        years.update(int(year_str) for year_str in holidays_data)
+
+    # 全工場で共有する土日祝日
+    base = update_base_calendar(base_path(DEFAULT_BASE, holidays_dir), sorted(years))
+
+    for factory in factories:
+        # 各工場のJSONファイルパス
+        json_path = os.path.join(holidays_dir, f"{factory}.json")
+        if factory in legacy:
+            holidays, workdays = HolidayCalendar.from_dict(legacy[factory]).overlay_against(base)
+            write_overlay(json_path, holidays, workdays)
+        elif not os.path.exists(json_path):
+            write_overlay(json_path)
+
+        # 読み込み高速化用のバイナリも更新
+        write_sidecar(json_path, holidays_dir)
 
 if __name__ == "__main__":
-    initialize_holidays()
-    print("工場の休日情報をリセットしました。")
+    # 引数で工場を指定した場合はその工場だけ更新（例: python data/holidays_initializer.py chiba）
+    initialize_holidays(sys.argv[1:] or None)
+    print("工場の休日情報を更新しました。")
@@ -0,0 +1,168 @@
+# data/month_template.py
+from data.excel_styles import StyleRegistry
+from data.year_month import month_index, month_info
+
+FIRST_DAY_COL = 4 # D列（1日）
+LAST_DAY_COL = 34 # AH列（31日）
+LAST_COL = 36 # AJ列
+
+# 浅い数式で1つの残り数量の数式に含める月数（超えた場合は区切りの月の残り数量から引く）
+SHALLOW_MAX_TERMS = 120
+
+_templates = {} # 項目の数 -> MonthBlockTemplate
+
+
+def shared_template(contents_rows=8):
+    """
+    プロセス内で共有するMonthBlockTemplate（項目の数ごとに1度だけ組み立てる）。
+    呼び出し方（引数の省略、位置、キーワード）によらず、項目の数が同じなら同じテンプレートを返す。
+    テンプレートは組み立て後に変更しないため、生成のたび・スレッド間で使い回せる。
+    """
+    template = _templates.get(contents_rows)
+    if template is None:
+        template = _templates.setdefault(contents_rows, MonthBlockTemplate(contents_rows))
+    return template
+
+
+class MonthBlockTemplate:
+    """
+    各月の表の共通部分（スタイル、セル結合、行高さ、数式）を1度だけ組み立てたテンプレート。
+    表の開始行（current_row）からの相対行で保持し、月ごとに変わる値だけを差し替えて使う。
+    """
+    def __init__(self, contents_rows=8):
+        self.contents_rows = contents_rows # 項目の数
+        self.rows_per_table = contents_rows + 5
+        self.block_rows = self.rows_per_table - 1 # 表の下端の行まで（最後の1行は空行）
+        content_offsets = range(3, contents_rows + 3)
+
+        # 行高さ（相対行 -> 高さ）
+        self.row_heights = {0: 32.5, 1: 23, 2: 23}
+        for row_offset in content_offsets:
+            self.row_heights[row_offset] = 36.8
+
+        # セル結合（開始相対行, 開始列, 終了相対行, 終了列）
+        self.merges = [
+            (0, 1, 2, 1), # 項目
+            (0, 2, 2, 2), # 規格
+            (0, 3, 2, 3), # 受注
+            (0, 35, 1, 36), # 合計
+            (0, FIRST_DAY_COL, 0, LAST_DAY_COL), # 月のタイトル
+        ]
+
+        # 数式（{row}は対象行、{prev_row}は前月の表の同じ行）
+        self.sum_formula = "=SUM(D{row}:AH{row})" # 合計数量の算出
+        self.first_remains_formula = "=C{row}-AI{row}" # 1つ目の表の残り数量
+        self.remains_formula = "=AJ{prev_row}-AI{row}" # 前月の残りから差し引き
+        self.carry_remains_formula = "={sheet}!AJ{carry_row}-AI{row}" # 前のシートの最後の表の残りから差し引き
+
+        # 日にちの列の基本スタイル（休日は StyleRegistry.holiday() の版に差し替え）
+        self.day_styles = {1: 'day', 2: 'weekday'}
+        for row_offset in content_offsets:
+            self.day_styles[row_offset] = 'body'
+
+        # 相対行ごとの各列の(値, スタイル名)
+        self.rows = [[(None, None)] * LAST_COL for _ in range(self.block_rows)]
+        for row_offset in range(0, 3):
+            for col in (1, 2, 3):
+                self.set(row_offset, col, None, 'header')
+        self.set(0, 1, "項目", 'header')
+        self.set(0, 2, "規格", 'header')
+        self.set(0, 3, "受注", 'header')
+        self.set(0, FIRST_DAY_COL, None, 'month_title')
+        for col in range(FIRST_DAY_COL + 1, LAST_DAY_COL + 1):
+            self.set(0, col, None, 'title_row')
+        for row_offset, style in self.day_styles.items():
+            for col in range(FIRST_DAY_COL, LAST_DAY_COL + 1):
+                self.set(row_offset, col, None, style)
+        self.set(0, 35, "合計", 'sum_header')
+        self.set(0, 36, None, 'sum_header')
+        self.set(1, 35, None, 'sum_header')
+        self.set(1, 36, None, 'sum_header')
+        self.set(2, 35, "数量", 'volume_header')
+        self.set(2, 36, "残り", 'remain_header')
+        for row_offset in content_offsets:
+            self.set(row_offset, 1, None, 'item')
+            self.set(row_offset, 2, None, 'spec')
+            self.set(row_offset, 3, "0", 'spec') # 受注初期値＝０
+            self.set(row_offset, 35, None, 'sum')
+            self.set(row_offset, 36, None, 'remain')
+        for col in range(1, LAST_COL + 1):
+            self.set(self.block_rows - 1, col, None, 'table_bottom')
+
+        # スパース出力用：入力部分の日にちの列（罫線は条件付き書式で描く）は書き込まない
+        self.sparse_rows = [list(row) for row in self.rows]
+        for row_offset in content_offsets:
+            for col in range(FIRST_DAY_COL, LAST_DAY_COL + 1):
+                self.sparse_rows[row_offset][col - 1] = (None, None)
+
+        # 1か月分で書き込むセル数（計測用）
+        self.cell_count = self.block_rows * LAST_COL
+        self.sparse_cell_count = sum(1 for row in self.sparse_rows for _value, style in row if style is not None)
+
+    def set(self, row_offset, col, value, style):
+        """
+        テンプレートのセルを設定。
+        """
+        self.rows[row_offset][col - 1] = (value, style)
+
+    def shallow_remains_formula(self, row, index, carry_cell=None):
+        """
+        index番目（0から）の表の残り数量を、1つ目の表の受注（C列）から各月の合計数量を順に引く数式で表す。
+        前月の残りから引く数式と同じ順に引くため結果は同じで、前月への参照が月数分つながらない。
+        SHALLOW_MAX_TERMSか月ごとに、区切りの直前の月の残り数量を起点にする（数式の長さの上限のため）。
+        carry_cell: 前のシートから引き継ぐ場合、受注の代わりに起点にするセル（前のシートの最後の表の残り）。
+        """
+        first = index - index % SHALLOW_MAX_TERMS
+        if first == 0 and carry_cell is not None:
+            terms = [carry_cell]
+        elif first == 0:
+            terms = [f"C{row - index * self.rows_per_table}"]
+        else:
+            terms = [f"AJ{row - (index - first + 1) * self.rows_per_table}"]
+        terms += [f"AI{row - (index - table) * self.rows_per_table}" for table in range(first, index + 1)]
+        return "=" + "-".join(terms)
+
+    def month_rows(self, year, month, title, holiday_mask, current_row, is_first_table, sparse=False,
+                   shallow_index=None, carry=None):
+        """
+        テンプレートに月ごとの差分（タイトル、日にち、曜日、休日、数式の行番号）を反映した
+        各行のセル一覧を返す。
+        holiday_maskはその月の休日のビットマスク（1日がbit0、HolidayCalendar.month_mask()）。
+        sparse: Trueの場合、値も固有の罫線もないセルは(None, None)とし、休日のスタイルも反映しない
+                （休日の色付けは条件付き書式で行う）。
+        shallow_index: 指定した場合、残り数量を浅い数式（shallow_remains_formula）にする。表の番号（0から）。
+        carry: 前のシートの残り数量を引き継ぐ場合、(引用符付きのシート名, 前のシートの最後の表の開始行)。
+               シートの1つ目の表（浅い数式では各表）の残り数量を、受注ではなく前のシートの最後の表の残りから引く。
+        """
+        if sparse:
+            rows = [list(row) for row in self.sparse_rows]
+            holiday_mask = 0
+        else:
+            rows = [list(row) for row in self.rows]
+        rows[0][FIRST_DAY_COL - 1] = (title, 'month_title')
+
+        # 日にち、曜日、休日
+        info = month_info(month_index(year, month))
+        for day in range(1, info.days + 1):
+            index = FIRST_DAY_COL + day - 2
+            rows[1][index] = (day, rows[1][index][1])
+            rows[2][index] = (info.weekday_labels[day - 1], rows[2][index][1])
+            if holiday_mask >> (day - 1) & 1:
+                for row_offset, style in self.day_styles.items():
+                    rows[row_offset][index] = (rows[row_offset][index][0], StyleRegistry.holiday(style))
+
+        # 合計数量、残り数量の数式
+        for row_offset in range(3, self.contents_rows + 3):
+            row = current_row + row_offset
+            carry_cell = f"{carry[0]}!AJ{carry[1] + row_offset}" if carry is not None else None
+            if shallow_index is not None:
+                remains = self.shallow_remains_formula(row, shallow_index, carry_cell)
+            elif is_first_table and carry is not None:
+                remains = self.carry_remains_formula.format(sheet=carry[0], carry_row=carry[1] + row_offset, row=row)
+            elif is_first_table: # 1つ目とそれ以降で計算を変更
+                remains = self.first_remains_formula.format(row=row)
+            else:
+                remains = self.remains_formula.format(row=row, prev_row=row - self.rows_per_table)
+            rows[row_offset][34] = (self.sum_formula.format(row=row), 'sum')
+            rows[row_offset][35] = (remains, 'remain')
+        return rows
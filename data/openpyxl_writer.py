@@ -0,0 +1,124 @@
+# data/openpyxl_writer.py
+from datetime import datetime, timezone
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import Rule
+from openpyxl.worksheet.cell_range import CellRange
+from openpyxl.writer.excel import ExcelWriter
+from data.excel_styles import StyleRegistry
+from data.schedule_layout import column_letter
+
+
+def open_archive(path, compress_level):
+    """
+    圧縮レベルを指定してxlsxのZIPを開く。
+    0は無圧縮、1~9はdeflateの圧縮レベル、Noneは既定（openpyxlと同じdeflate）。
+    """
+    if compress_level is None:
+        return ZipFile(path, 'w', ZIP_DEFLATED, allowZip64=True)
+    if compress_level == 0:
+        return ZipFile(path, 'w', ZIP_STORED, allowZip64=True)
+    return ZipFile(path, 'w', ZIP_DEFLATED, allowZip64=True, compresslevel=compress_level)
+
+
+class OpenpyxlWriter:
+    """
+    openpyxlのワークブックに書き出すバックエンド。
+    streaming=Trueの場合は書き込み専用モードで行を上から順に出力し、セルをメモリに保持しない。
+    """
+    def __init__(self, layout, streaming=False, compress_level=None):
+        self.streaming = streaming
+        self.compress_level = compress_level
+        self.wb = openpyxl.Workbook(write_only=streaming)
+        self.styles = StyleRegistry(self.wb)
+        self.ws = None
+        self.add_sheet(layout)
+
+    def add_sheet(self, layout):
+        """
+        シートを追加し、以降の書き出し先にする（スタイルはワークブック内で共有）。
+        """
+        self.layout = layout
+        if self.ws is None and not self.streaming:
+            self.ws = self.wb.active
+            self.ws.title = layout.sheet_title
+        else:
+            self.ws = self.wb.create_sheet(layout.sheet_title)
+        self.next_stream_row = 1
+
+        # 表示倍率、列幅、列の既定の書式（書き込み専用モードではセルより先に設定する必要がある）
+        self.ws.sheet_view.zoomScale = layout.zoom_scale
+        for col, width in layout.column_widths.items():
+            self.ws.column_dimensions[column_letter(col)].width = width
+        if layout.column_style is not None:
+            for col in layout.style_columns:
+                self.styles.apply(self.ws.column_dimensions[column_letter(col)], layout.column_style)
+
+    def write_block(self, block):
+        """
+        行のまとまり（シート上部、1か月分の表）を書き出す。
+        """
+        # 各月の結合範囲は重ならないため、重複チェックなしで追加
+        for start_row, start_col, end_row, end_col in block.merges:
+            self.ws.merged_cells.ranges.add(CellRange(min_col=start_col, min_row=start_row,
+                                                      max_col=end_col, max_row=end_row))
+        for row, height in block.heights.items():
+            self.ws.row_dimensions[row].height = height
+
+        if self.streaming:
+            for row_offset, cells in enumerate(block.rows):
+                self.stream_row(block.start_row + row_offset, cells)
+            return
+        for row_offset, cells in enumerate(block.rows):
+            row = block.start_row + row_offset
+            for col, (value, style) in enumerate(cells, start=1):
+                if style is None:
+                    continue
+                cell = self.ws.cell(row=row, column=col, value=value)
+                self.styles.apply(cell, style)
+
+    def stream_row(self, row, cells):
+        """
+        書き込み専用モードで1行を出力。
+        cellsはA列からの(値, スタイル名)のリスト。間の空行も埋めて出力する。
+        """
+        while self.next_stream_row < row:
+            self.ws.append([])
+            self.next_stream_row += 1
+        values = []
+        for value, style in cells:
+            cell = WriteOnlyCell(self.ws, value=value)
+            if style:
+                self.styles.apply(cell, style)
+            values.append(cell)
+        self.ws.append(values)
+        self.next_stream_row += 1
+
+    def write_holiday_flags(self, rows):
+        """
+        スパース出力の休日の一覧を非表示シートに書き出す。
+        """
+        flags = self.wb.create_sheet(self.layout.flag_sheet_title)
+        for row in rows:
+            flags.append(row)
+        flags.sheet_state = 'hidden'
+
+    def add_conditional_formats(self, formats):
+        for area, formula, style in formats:
+            self.ws.conditional_formatting.add(
+                area, Rule(type='expression', formula=[formula], dxf=self.styles.differential[style]))
+
+    def save(self, path):
+        """
+        指定した圧縮レベルでワークブックを保存（openpyxlのsave_workbookと同じ手順）。
+        """
+        archive = open_archive(path, self.compress_level)
+        try:
+            self.wb.properties.modified = datetime.now(tz=timezone.utc).replace(tzinfo=None)
+            ExcelWriter(self.wb, archive).save()
+        finally:
+            archive.close()
+
+    def close(self):
+        """保存せずに終了する場合の後始末（openpyxlでは不要）"""
@@ -0,0 +1,181 @@
+# data/schedule_layout.py
+from collections import namedtuple
+from data.month_template import shared_template, FIRST_DAY_COL, LAST_DAY_COL, LAST_COL
+
+SHEET_TITLE = "製造工程"
+ZOOM_SCALE = 55
+FIRST_TABLE_ROW = 9 # 1つ目の表の開始行
+
+# 列幅（A列、B列、C列~AL列）
+COLUMN_WIDTHS = {1: 25, 2: 30}
+for _col in range(3, 38):
+    COLUMN_WIDTHS[_col] = 6
+
+# スパース出力で休日の一覧を置く非表示シート
+HOLIDAY_FLAG_SHEET = "休日"
+
+# シート名に使えない文字と最大文字数
+INVALID_SHEET_CHARS = '[]:*?/\\'
+MAX_SHEET_TITLE = 31
+
+# 書き出す行のまとまり（シート上部、各月の表）
+# rows: start_rowからの各行の(値, スタイル名)のリスト（(None, None)のセルは書き込まない）
+# merges: (開始行, 開始列, 終了行, 終了列)のリスト、heights: {行: 高さ}
+# values: 数式のセルの計算結果 {(行, 列): 値}（書き込まない場合はNone）
+Block = namedtuple('Block', ['start_row', 'rows', 'merges', 'heights', 'values'], defaults=[None])
+
+# 条件付き書式（範囲、数式、差分スタイル名）
+ConditionalFormat = namedtuple('ConditionalFormat', ['area', 'formula', 'style'])
+
+
+def sheet_titles(names, reserved=()):
+    """
+    シート名として使える、重複しない名前の一覧を作成。
+    使えない文字は'_'に置き換え、31文字までに切り詰め、重複には(2)、(3)...を付ける。
+    reservedの名前とも重複しないようにする。
+    """
+    used = {name.lower() for name in reserved}
+    titles = []
+    for name in names:
+        base = ''.join('_' if char in INVALID_SHEET_CHARS else char for char in str(name)).strip("' ")
+        base = base[:MAX_SHEET_TITLE] or SHEET_TITLE
+        title = base
+        number = 2
+        while title.lower() in used:
+            suffix = f"({number})"
+            title = base[:MAX_SHEET_TITLE - len(suffix)] + suffix
+            number += 1
+        used.add(title.lower())
+        titles.append(title)
+    return titles
+
+
+def quote_sheet_title(title):
+    """数式で他のシートを参照するためのシート名（引用符で囲む）"""
+    return "'" + title.replace("'", "''") + "'"
+
+
+def column_letter(col):
+    """列番号を列名に変換（1 -> 'A'、36 -> 'AJ'）"""
+    letters = ''
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+class ScheduleLayout:
+    """
+    工程表のシートの構成（列幅、シート上部、各月の表、スパース出力の条件付き書式）。
+    書き出し方法には依存せず、各バックエンド（data/openpyxl_writer.py、data/xml_writer.py）は
+    この内容をそのまま書き出す。
+    """
+    def __init__(self, title, created_date_str, contents_rows=8, sparse=False, sheet_title=SHEET_TITLE,
+                 flag_sheet_title=HOLIDAY_FLAG_SHEET, template=None, shallow_formulas=False, cached_values=False,
+                 carry_from=None):
+        """
+        template: 複数のシートで共有するMonthBlockTemplate（省略時はプロセス内で共有するもの）。
+        flag_sheet_title: スパース出力の休日の一覧を置く非表示シートの名前。
+        shallow_formulas: Trueの場合、残り数量を前月の残りではなく1つ目の表の受注から引く数式にする
+                          （MonthBlockTemplate.shallow_remains_formula）。
+        cached_values: Trueの場合、合計数量と残り数量の計算結果を各月の表に含める（Block.values）。
+        carry_from: 前のシートから残り数量を引き継ぐ場合、(前のシートの名前, 前のシートの月数)。
+                    1つ目の表の残り数量は前のシートの最後の表の残りから引く数式になる。
+        """
+        self.title = title
+        self.created_date_str = created_date_str
+        self.sparse = sparse
+        self.shallow_formulas = shallow_formulas
+        self.cached_values = cached_values
+        self.template = template or shared_template(contents_rows)
+        self.rows_per_table = self.template.rows_per_table
+        self.sheet_title = sheet_title
+        self.flag_sheet_title = flag_sheet_title
+        self.carry = None
+        if carry_from is not None:
+            carry_title, carry_months = carry_from
+            self.carry = (quote_sheet_title(carry_title), self.table_row(carry_months - 1))
+        self.zoom_scale = ZOOM_SCALE
+        self.column_widths = COLUMN_WIDTHS
+        # スパース出力ではA列~AJ列に既定の書式を設定
+        self.column_style = 'column_default' if sparse else None
+        self.style_columns = range(1, LAST_COL + 1)
+
+    def table_row(self, index):
+        """index番目（0から）の月の表の開始行"""
+        return FIRST_TABLE_ROW + index * self.rows_per_table
+
+    def header_block(self):
+        """シート上部（作成日、タイトル、定型コメント）"""
+        date_row = [(None, None)] * 31
+        date_row[30] = (self.created_date_str, 'date') # AE1
+        comment_row = [(None, None)] * LAST_COL
+        comment_row[0] = ("※以下の日程は生コン打設となります。", 'comment')
+        comment_row[35] = ("ベルテクス株式会社", 'company') # AJ4
+        rows = [date_row, [], [(f"{self.title} 製造工程計画", 'sheet_title')], comment_row]
+        merges = [(1, 31, 1, 36), (3, 1, 3, 36)] # AE1:AJ1、A3:AJ3
+        heights = {1: 32.5, 3: 58.5, 4: 32.5}
+        return Block(1, rows, merges, heights)
+
+    def month_block(self, index, year, month, month_title, holiday_mask):
+        """
+        index番目（0から）の月の表。
+        month_titleは表のタイトル（令和の年月）、holiday_maskはその月の休日のビットマスク。
+        """
+        current_row = self.table_row(index)
+        rows = self.template.month_rows(year, month, month_title, holiday_mask, current_row, index == 0,
+                                        self.sparse, index if self.shallow_formulas else None, self.carry)
+        merges = [(current_row + start_offset, start_col, current_row + end_offset, end_col)
+                  for start_offset, start_col, end_offset, end_col in self.template.merges]
+        heights = {current_row + row_offset: height for row_offset, height in self.template.row_heights.items()}
+        values = self.formula_values(current_row) if self.cached_values else None
+        return Block(current_row, rows, merges, heights, values)
+
+    def formula_values(self, current_row):
+        """
+        各月の表の合計数量（AI列）と残り数量（AJ列）の計算結果。
+        生成直後は日にちの列が空のため合計数量は0、残り数量は1つ目の表の受注（C列の初期値）になる。
+        """
+        values = {}
+        for row_offset in range(3, self.template.contents_rows + 3):
+            order = float(self.template.rows[row_offset][2][0] or 0)
+            values[(current_row + row_offset, 35)] = 0
+            values[(current_row + row_offset, 36)] = int(order) if order.is_integer() else order
+        return values
+
+    def cells_per_month(self):
+        """1か月分で書き込むセル数（計測用）"""
+        return self.template.sparse_cell_count if self.sparse else self.template.cell_count
+
+    def holiday_flag_rows(self, holiday_masks):
+        """
+        スパース出力の休日の一覧（1行が1か月、日にちの列に休日なら1）。
+        holiday_masksは各月の休日のビットマスク（表の順）。
+        """
+        for mask in holiday_masks:
+            row = [None] * LAST_DAY_COL
+            for day in range(1, LAST_DAY_COL - FIRST_DAY_COL + 2):
+                if mask >> (day - 1) & 1:
+                    row[FIRST_DAY_COL + day - 2] = 1
+            yield row
+
+    def conditional_formats(self, month_count):
+        """
+        スパース出力の条件付き書式（休日の色付け、入力部分の点線の罫線）。
+        シート全体で1つずつのルールとし、表の中での相対行（0がタイトル行）で対象の行を判定する。
+        """
+        last_row = self.table_row(month_count) - 1
+        last_offset = self.template.contents_rows + 2
+        offset = f"MOD(ROW()-{FIRST_TABLE_ROW},{self.rows_per_table})"
+        first_col = column_letter(FIRST_DAY_COL)
+        area = f"{first_col}{FIRST_TABLE_ROW}:{column_letter(LAST_DAY_COL)}{last_row}"
+
+        # 休日（日にち、曜日、入力部分）
+        flag_range = f"{quote_sheet_title(self.flag_sheet_title)}!{first_col}$1:{first_col}${max(month_count, 1)}"
+        holiday_formula = (f"AND({offset}>=1,{offset}<={last_offset},"
+                           f"INDEX({flag_range},INT((ROW()-{FIRST_TABLE_ROW})/{self.rows_per_table})+1)=1)")
+        grid_formula = f"AND({offset}>=3,{offset}<={last_offset})"
+        return [
+            ConditionalFormat(area, holiday_formula, 'holiday'),
+            ConditionalFormat(area, grid_formula, 'body_grid'),
+        ]
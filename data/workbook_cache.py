@@ -0,0 +1,160 @@
+# data/workbook_cache.py
+"""
+生成した工程表のキャッシュ。
+
+生成の入力（タイトル、期間、工場、休日JSONの内容、出力形式、圧縮レベル、ExcelGeneratorの版）のハッシュを
+キーとしてxlsxを保存し、同じ入力で生成する場合は作り直さずにコピーする。
+作成日（AE1）が違う場合は、その文字列だけを差し替えてコピーする。
+合計サイズが上限を超えたら、最後に使われた日時が古いものから削除する（LRU）。
+
+環境変数:
+    WORK_SCHEDULER_CACHE_DIR     キャッシュの保存先
+    WORK_SCHEDULER_CACHE_MAX_MB  キャッシュの合計サイズの上限（MB）
+"""
+from xml.sax.saxutils import escape
+from zipfile import ZipFile, BadZipFile
+import hashlib
+import json
+import os
+import shutil
+import threading
+
+from data.openpyxl_writer import open_archive
+from utils.file_helper import atomic_output
+from utils.path_helper import user_cache_dir
+
+CACHE_DIR_ENV = 'WORK_SCHEDULER_CACHE_DIR'
+CACHE_MAX_ENV = 'WORK_SCHEDULER_CACHE_MAX_MB'
+DEFAULT_MAX_MB = 200
+
+# 作成日の文字列が入るZIP内のファイル（openpyxlは共有文字列、XMLバックエンドは各シートに直接書く）
+DATE_MEMBERS = ('xl/sharedStrings.xml', 'xl/worksheets/sheet')
+
+
+def default_cache_dir():
+    """キャッシュの既定の保存先"""
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.environ[CACHE_DIR_ENV]
+    return user_cache_dir('workbooks')
+
+
+def cache_key(**inputs):
+    """生成の入力からキャッシュのキー（SHA-256の16進数）を作成"""
+    payload = json.dumps(inputs, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def patch_created_date(source, target, old_date, new_date, compress_level=None):
+    """
+    キャッシュのxlsxをtargetに書き出し、作成日の文字列だけを差し替える。
+    複数のシートがある場合は、各シートの作成日を差し替える。
+    """
+    old_xml = f">{escape(old_date)}<".encode('utf-8')
+    new_xml = f">{escape(new_date)}<".encode('utf-8')
+    patched = False
+    with ZipFile(source) as src:
+        archive = open_archive(target, compress_level)
+        try:
+            for info in src.infolist():
+                data = src.read(info)
+                if info.filename.startswith(DATE_MEMBERS) and old_xml in data:
+                    data = data.replace(old_xml, new_xml, 1)
+                    patched = True
+                archive.writestr(info.filename, data)
+        finally:
+            archive.close()
+    if not patched:
+        raise ValueError("キャッシュのファイルに作成日が見つかりません。")
+
+
+class WorkbookCache:
+    """
+    生成した工程表のキャッシュ（サイズ上限付きのLRU）。
+    use_hardlinks: Trueの場合、作成日が同じならコピーの代わりにハードリンクを作る
+                   （出力先のファイルを直接上書き編集するとキャッシュも変わるため、既定はコピー）。
+    """
+    def __init__(self, cache_dir=None, max_bytes=None, use_hardlinks=False):
+        self.cache_dir = cache_dir or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get(CACHE_MAX_ENV, DEFAULT_MAX_MB)) * 1024 * 1024)
+        self.max_bytes = max_bytes
+        self.use_hardlinks = use_hardlinks
+        self.lock = threading.Lock()
+
+    def entry_paths(self, key):
+        """キャッシュの(xlsx, 作成日などの情報のJSON)のパス"""
+        return (os.path.join(self.cache_dir, f"{key}.xlsx"),
+                os.path.join(self.cache_dir, f"{key}.json"))
+
+    def fetch(self, key, output_path, created_date_str, compress_level=None):
+        """
+        キャッシュがあればoutput_pathに書き出してTrueを返す。ない、または読めない場合はFalse。
+        """
+        workbook_path, info_path = self.entry_paths(key)
+        try:
+            with open(info_path, 'r', encoding='utf-8') as f:
+                cached_date = json.load(f)['created_date']
+            os.utime(workbook_path) # 最後に使われた日時（LRUの順序）を更新
+        except (OSError, ValueError, KeyError):
+            return False
+
+        try:
+            with atomic_output(output_path) as temp_path:
+                if cached_date != created_date_str:
+                    patch_created_date(workbook_path, temp_path, cached_date, created_date_str, compress_level)
+                elif self.use_hardlinks:
+                    os.remove(temp_path)
+                    os.link(workbook_path, temp_path)
+                else:
+                    shutil.copyfile(workbook_path, temp_path)
+        except (OSError, ValueError, BadZipFile) as e:
+            print(f"キャッシュを使用できませんでした: {e}")
+            self.remove(key)
+            return False
+        return True
+
+    def store(self, key, source_path, created_date_str):
+        """
+        生成したファイルをキャッシュに追加し、上限を超えた分を削除する。
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        workbook_path, info_path = self.entry_paths(key)
+        with atomic_output(workbook_path) as temp_path:
+            shutil.copyfile(source_path, temp_path)
+        with atomic_output(info_path) as temp_path:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created_date': created_date_str}, f)
+        self.evict()
+
+    def remove(self, key):
+        for path in self.entry_paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        """合計サイズが上限以下になるまで、最後に使われた日時が古いものから削除"""
+        with self.lock:
+            entries = []
+            for filename in os.listdir(self.cache_dir):
+                if not filename.endswith('.xlsx'):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename[:-len('.xlsx')]))
+            total = sum(size for _mtime, size, _key in entries)
+            for _mtime, size, key in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                self.remove(key)
+                total -= size
+
+    def clear(self):
+        """キャッシュをすべて削除"""
+        if os.path.exists(self.cache_dir):
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith(('.xlsx', '.json')):
+                    os.remove(os.path.join(self.cache_dir, filename))
@@ -0,0 +1,299 @@
+# data/workbook_extender.py
+"""
+生成済みの工程表（xlsx）の末尾に月の表を追加する（期間の延長）。
+
+シートのXMLは解析せずにそのまま一時領域へ写し、末尾の一定量だけを調べて最後の月の表を見つける。
+追加する月の行は、最後の表の後ろにXMLとして書き足す（「残り」は最後の表から続く数式になる）。
+入力済みの数量や受注などの既存の内容は変更しない。処理時間は追加する月数と、
+ZIPを書き直すためのファイルサイズに比例し、既存の月の表を組み立て直すことはない。
+"""
+from copy import copy
+from shutil import copyfileobj
+from tempfile import SpooledTemporaryFile
+from xml.sax.saxutils import unescape
+from zipfile import ZipFile
+import posixpath
+import re
+
+import openpyxl
+from openpyxl.styles.stylesheet import apply_stylesheet, write_stylesheet
+from openpyxl.xml.functions import tostring
+
+from data.excel_styles import StyleRegistry
+from data.month_template import FIRST_DAY_COL, LAST_COL
+from data.openpyxl_writer import open_archive
+from data.schedule_layout import FIRST_TABLE_ROW, HOLIDAY_FLAG_SHEET, column_letter
+from data.xml_writer import XmlSheet
+
+# 最後の表を探すためにシートのXMLの末尾から保持する大きさ
+TAIL_WINDOW = 1024 * 1024
+
+COPY_CHUNK = 1024 * 1024
+
+STYLES_PART = 'xl/styles.xml'
+WORKBOOK_PART = 'xl/workbook.xml'
+
+REIWA_RE = re.compile(r'令和(\d+|元)年(\d+)月')
+# 年ごと・年度ごとにシートを分けた工程表のシート名（ExcelGeneratorのsplit、'2024年'、'2024年度'）
+SPLIT_SHEET_RE = re.compile(r'^\d{4}年(度)?$')
+ROW_RE = re.compile(rb'<row\b[^>]*?\br="(\d+)"')
+DIMENSION_RE = re.compile(rb'<dimension ref="[^"]*"\s*/>')
+MERGE_CELLS_RE = re.compile(rb'<mergeCells count="(\d+)"\s*>')
+CALC_PR_RE = re.compile(rb'<calcPr\b([^>]*?)(/?)>')
+SHEET_RE = re.compile(rb'<sheet\b[^>]*>')
+SHARED_STRING_RE = re.compile(rb'<si>(.*?)</si>', re.S)
+TEXT_RE = re.compile(rb'<t(?:\s[^>]*)?>(.*?)</t>', re.S)
+
+
+def attribute(tag, name):
+    """XMLの開始タグの属性の値（なければNone）"""
+    match = re.search(rb'\b' + name + rb'="([^"]*)"', tag)
+    return match.group(1).decode('utf-8') if match else None
+
+
+def text_of(xml):
+    """<t>要素の文字列をつなげた値"""
+    return unescape(b''.join(TEXT_RE.findall(xml)).decode('utf-8'))
+
+
+def parse_month_title(title):
+    """月の表のタイトル（'令和6年1月'）を(年, 月)に変換"""
+    match = REIWA_RE.search(title or '')
+    if not match:
+        return None
+    reiwa_year = 1 if match.group(1) == '元' else int(match.group(1))
+    return reiwa_year + 2018, int(match.group(2))
+
+
+class WorkbookExtender:
+    """
+    生成済みの工程表（表示されるシートが1つのもの）のシートに月の表を書き足す。
+    open()で最後の月の表（last_index、last_year、last_month）を調べ、write_block()で表を追加し、save()で保存する。
+    """
+    def __init__(self, source_path, layout, compress_level=None):
+        self.source_path = source_path
+        self.layout = layout
+        self.compress_level = compress_level
+        self.source = None
+        self.sheet = None
+
+    def open(self):
+        self.source = ZipFile(self.source_path)
+        self.sheet_part = self.first_sheet_part()
+        self.read_sheet()
+        self.find_last_table()
+        self.xf_ids, self.stylesheet = self.merge_styles()
+        self.sheet = XmlSheet(self.layout)
+        self.sheet.max_row = self.last_row
+        return self
+
+    def first_sheet_part(self):
+        """
+        1つ目のシートのZIP内のパス。
+        スパース出力の工程表と、複数の工程表をまとめたワークブック（表示されるシートが複数）、
+        年ごとにシートを分けた工程表（残り数量がシートをまたいでつながる）は延長できない。
+        """
+        workbook = self.source.read(WORKBOOK_PART)
+        sheets = SHEET_RE.findall(workbook)
+        if not sheets:
+            raise ValueError("ワークブックにシートがありません。")
+        for tag in sheets:
+            name = attribute(tag, b'name') or ''
+            if name.startswith(HOLIDAY_FLAG_SHEET) and attribute(tag, b'state') == 'hidden':
+                raise ValueError("スパース出力の工程表は延長できません。生成し直してください。")
+        visible = [tag for tag in sheets if attribute(tag, b'state') not in ('hidden', 'veryHidden')]
+        for tag in visible:
+            if SPLIT_SHEET_RE.match(unescape(attribute(tag, b'name') or '')):
+                raise ValueError("年ごとにシートを分けた工程表は延長できません。生成し直してください。")
+        if len(visible) > 1:
+            raise ValueError("複数のシートがある工程表は延長できません。生成し直してください。")
+        rel_id = attribute(sheets[0], b'r:id')
+        rels = self.source.read('xl/_rels/workbook.xml.rels')
+        for tag in re.findall(rb'<Relationship\b[^>]*>', rels):
+            if attribute(tag, b'Id') == rel_id:
+                target = attribute(tag, b'Target')
+                if target.startswith('/'):
+                    return target[1:]
+                return posixpath.normpath(posixpath.join('xl', target))
+        raise ValueError("シートのファイルが見つかりません。")
+
+    def read_sheet(self):
+        """
+        シートのXMLを行データの前（head）、行データ（一時領域に写す）、行データの後（tail）に分ける。
+        行データの末尾TAIL_WINDOWバイトは最後の表を探すために保持する。
+        """
+        self.body = SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+        window = b''
+        with self.source.open(self.sheet_part) as f:
+            buffer = b''
+            while b'<sheetData' not in buffer or b'>' not in buffer[buffer.index(b'<sheetData'):]:
+                chunk = f.read(COPY_CHUNK)
+                if not chunk:
+                    raise ValueError("シートに行データがありません。")
+                buffer += chunk
+            start = buffer.index(b'>', buffer.index(b'<sheetData')) + 1
+            if buffer[start - 2:start] == b'/>':
+                raise ValueError("シートに行データがありません。")
+            self.head = buffer[:start]
+            buffer = buffer[start:]
+
+            marker = b'</sheetData>'
+            while True:
+                end = buffer.find(marker)
+                if end >= 0:
+                    self.body.write(buffer[:end])
+                    window = (window + buffer[:end])[-TAIL_WINDOW:]
+                    self.tail = buffer[end:] + f.read()
+                    break
+                # 区切りの文字列が読み込みの境目にかかる場合に備えて末尾を残す
+                keep = len(marker) - 1
+                self.body.write(buffer[:-keep])
+                window = (window + buffer[:-keep])[-TAIL_WINDOW:]
+                chunk = f.read(COPY_CHUNK)
+                if not chunk:
+                    raise ValueError("シートのXMLが途中で終わっています。")
+                buffer = buffer[-keep:] + chunk
+        self.window = window
+
+    def shared_string(self, index):
+        """共有文字列のindex番目の値"""
+        try:
+            data = self.source.read('xl/sharedStrings.xml')
+        except KeyError:
+            return None
+        for number, match in enumerate(SHARED_STRING_RE.finditer(data)):
+            if number == index:
+                return text_of(match.group(1))
+        return None
+
+    def cell_value(self, row_xml, ref):
+        """行のXMLから指定したセルの文字列の値を取得"""
+        match = re.search(rb'<c\b[^>]*\br="' + ref.encode('ascii') + rb'"[^>]*?(/>|>(.*?)</c>)', row_xml, re.S)
+        if not match or match.group(2) is None:
+            return None
+        cell_type = attribute(match.group(0)[:match.group(0).index(b'>') + 1], b't')
+        content = match.group(2)
+        if cell_type == 's':
+            value = re.search(rb'<v>(\d+)</v>', content)
+            return self.shared_string(int(value.group(1))) if value else None
+        if cell_type in ('inlineStr', 'str'):
+            if cell_type == 'str':
+                value = re.search(rb'<v>(.*?)</v>', content, re.S)
+                return unescape(value.group(1).decode('utf-8')) if value else None
+            return text_of(content)
+        return None
+
+    def find_last_table(self):
+        """
+        行データの末尾から最後の月の表（タイトルのある行）を探す。
+        最後の表より下に内容がある場合は延長できない。
+        """
+        rows = [(int(match.group(1)), match.start()) for match in ROW_RE.finditer(self.window)]
+        if not rows:
+            raise ValueError("シートに行データがありません。")
+        rows_per_table = self.layout.rows_per_table
+        title_ref = column_letter(FIRST_DAY_COL)
+        for number, (row, position) in reversed(list(enumerate(rows))):
+            if row < FIRST_TABLE_ROW or (row - FIRST_TABLE_ROW) % rows_per_table:
+                continue
+            end = rows[number + 1][1] if number + 1 < len(rows) else len(self.window)
+            year_month = parse_month_title(self.cell_value(self.window[position:end], f"{title_ref}{row}"))
+            if year_month is None:
+                continue
+            self.last_index = (row - FIRST_TABLE_ROW) // rows_per_table
+            self.last_year, self.last_month = year_month
+            self.last_row = rows[-1][0]
+            if self.last_row >= self.layout.table_row(self.last_index + 1):
+                raise ValueError("最後の月の表より下に内容があるため延長できません。")
+            return
+        raise ValueError("月の表が見つかりません。工程表のファイルを指定してください。")
+
+    def merge_styles(self):
+        """
+        既存のスタイルに工程表のスタイルを追加し、(スタイル名 -> セル書式の番号, 書き換えたstyles.xmlまたはNone)を返す。
+        既存のファイルにすべてのスタイルがあれば、styles.xmlは変更しない。
+        """
+        wb = openpyxl.Workbook()
+        apply_stylesheet(self.source, wb)
+        reference = openpyxl.Workbook()
+        registry = StyleRegistry(reference)
+        named = [style.name for style in wb._named_styles]
+        count = len(wb._cell_styles)
+        xf_ids = {}
+        for name, array in registry.arrays.items():
+            merged = copy(array)
+            merged.fontId = wb._fonts.add(reference._fonts[array.fontId])
+            merged.fillId = wb._fills.add(reference._fills[array.fillId])
+            merged.borderId = wb._borders.add(reference._borders[array.borderId])
+            merged.alignmentId = wb._alignments.add(reference._alignments[array.alignmentId])
+            merged.protectionId = wb._protections.add(reference._protections[array.protectionId])
+            merged.xfId = named.index(name) if name in named else 0
+            xf_ids[name] = wb._cell_styles.add(merged)
+        stylesheet = tostring(write_stylesheet(wb)) if len(wb._cell_styles) != count else None
+        return xf_ids, stylesheet
+
+    def write_block(self, block):
+        """月の表を書き足す"""
+        self.sheet.write_block(block, self.xf_ids)
+
+    def sheet_xml_parts(self):
+        """書き換えたシートのXML（行データの前、行データの後）"""
+        head = DIMENSION_RE.sub(
+            f'<dimension ref="A1:{column_letter(LAST_COL)}{self.sheet.max_row}"/>'.encode('utf-8'), self.head, 1)
+        tail = self.tail
+        if self.sheet.merges:
+            match = MERGE_CELLS_RE.search(tail)
+            if match is None:
+                raise ValueError("セル結合の情報が見つかりません。")
+            count = int(match.group(1)) + len(self.sheet.merges)
+            end = tail.index(b'</mergeCells>', match.end())
+            tail = (tail[:match.start()] + f'<mergeCells count="{count}">'.encode('utf-8')
+                    + tail[match.end():end] + ''.join(self.sheet.merges).encode('utf-8') + tail[end:])
+        return head, tail
+
+    def workbook_xml(self):
+        """追加した数式を開いたときに計算させるworkbook.xml"""
+        workbook = self.source.read(WORKBOOK_PART)
+        match = CALC_PR_RE.search(workbook)
+        if match is None:
+            return workbook.replace(b'</workbook>', b'<calcPr fullCalcOnLoad="1"/></workbook>', 1)
+        if b'fullCalcOnLoad' in match.group(1):
+            return re.sub(rb'fullCalcOnLoad="[^"]*"', b'fullCalcOnLoad="1"', workbook, 1)
+        return (workbook[:match.start()] + b'<calcPr' + match.group(1) + b' fullCalcOnLoad="1"'
+                + match.group(2) + b'>' + workbook[match.end():])
+
+    def save(self, path):
+        """延長したワークブックを保存"""
+        head, tail = self.sheet_xml_parts()
+        archive = open_archive(path, self.compress_level)
+        try:
+            for info in self.source.infolist():
+                if info.filename == self.sheet_part:
+                    with archive.open(self.sheet_part, 'w', force_zip64=True) as f:
+                        f.write(head)
+                        self.body.seek(0)
+                        copyfileobj(self.body, f)
+                        self.sheet.sheet_data.seek(0)
+                        copyfileobj(self.sheet.sheet_data, f)
+                        f.write(tail)
+                elif info.filename == STYLES_PART and self.stylesheet is not None:
+                    archive.writestr(info.filename, self.stylesheet)
+                elif info.filename == WORKBOOK_PART:
+                    archive.writestr(info.filename, self.workbook_xml())
+                else:
+                    with self.source.open(info) as src, archive.open(info.filename, 'w', force_zip64=True) as dst:
+                        copyfileobj(src, dst, COPY_CHUNK)
+        finally:
+            archive.close()
+
+    def close(self):
+        """一時領域と元のファイルを閉じる（複数回呼び出してもよい）"""
+        if self.sheet is not None:
+            self.sheet.close()
+            self.sheet = None
+        if getattr(self, 'body', None) is not None:
+            self.body.close()
+            self.body = None
+        if self.source is not None:
+            self.source.close()
+            self.source = None
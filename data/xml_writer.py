@@ -0,0 +1,321 @@
+# data/xml_writer.py
+"""
+工程表のレイアウト専用の高速な書き出しバックエンド。
+シートのXMLを文字列として直接組み立ててZIPに書き込み、セルごとのPythonオブジェクトを作らない。
+styles.xmlはopenpyxlのバックエンドと同じスタイル登録簿からプロセス内で1度だけ生成して使い回す。
+"""
+from datetime import datetime, timezone
+from shutil import copyfileobj
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from xml.sax.saxutils import escape, quoteattr
+import threading
+import openpyxl
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles.stylesheet import write_stylesheet
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.writer.theme import theme_xml
+from openpyxl.xml.functions import tostring
+from data.excel_styles import StyleRegistry
+from data.month_template import LAST_COL
+from data.openpyxl_writer import open_archive
+from data.schedule_layout import column_letter
+
+SHEET_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+PAGE_MARGINS = '<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/>'
+
+# この大きさまではシートのXMLをメモリに置き、超えたら一時ファイルに書き出す
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+COLUMN_LETTERS = [None] + [column_letter(col) for col in range(1, LAST_COL + 1)]
+
+_styles_cache = None
+_styles_lock = threading.Lock()
+
+
+def precomputed_styles():
+    """
+    (styles.xmlの内容, スタイル名 -> セル書式の番号, 差分スタイル名 -> 条件付き書式の書式番号) を取得。
+    openpyxlのバックエンドと同じ登録簿から生成するため、どちらで出力しても書式は同じになる。
+    """
+    global _styles_cache
+    with _styles_lock:
+        if _styles_cache is None:
+            wb = openpyxl.Workbook()
+            registry = StyleRegistry(wb)
+            xf_ids = {name: wb._cell_styles.add(array) for name, array in registry.arrays.items()}
+            dxf_ids = {name: wb._differential_styles.add(style) for name, style in registry.differential.items()}
+            _styles_cache = (tostring(write_stylesheet(wb)), xf_ids, dxf_ids)
+        return _styles_cache
+
+
+def cell_xml(ref, value, style_id, cached=None):
+    """1セル分のXML（cachedは数式のセルの計算結果）"""
+    style = f' s="{style_id}"' if style_id else ''
+    if value is None:
+        return f'<c r="{ref}"{style}/>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"{style} t="n"><v>{value}</v></c>'
+    if ILLEGAL_CHARACTERS_RE.search(value):
+        raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+    if value.startswith('='):
+        cached_xml = '' if cached is None else cached
+        return f'<c r="{ref}"{style}><f>{escape(value[1:])}</f><v>{cached_xml}</v></c>'
+    space = ' xml:space="preserve"' if value != value.strip() else ''
+    return f'<c r="{ref}"{style} t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+
+
+class XmlSheet:
+    """
+    XmlWriterの1シート分の内容。
+    行データは上から順に一時領域へ書き出し、セル結合と条件付き書式は保存時にまとめて書き出す。
+    """
+    def __init__(self, layout):
+        self.layout = layout
+        self.title = layout.sheet_title
+        self.state = 'visible'
+        self.sheet_data = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.merges = []
+        self.max_row = 1
+        self.formats = []
+
+    def write_block(self, block, xf_ids):
+        heights = block.heights
+        values = block.values or {}
+        parts = []
+        for row_offset, cells in enumerate(block.rows):
+            row = block.start_row + row_offset
+            cell_parts = []
+            for col, (value, style) in enumerate(cells, start=1):
+                if style is None and value is None:
+                    continue
+                cell_parts.append(cell_xml(f"{COLUMN_LETTERS[col]}{row}", value, xf_ids.get(style, 0),
+                                           values.get((row, col)) if values else None))
+            height = heights.get(row)
+            if not cell_parts and height is None:
+                continue
+            height_attr = f' ht="{height}" customHeight="1"' if height is not None else ''
+            parts.append(f'<row r="{row}"{height_attr}>')
+            parts.extend(cell_parts)
+            parts.append('</row>')
+            self.max_row = row
+        self.sheet_data.write(''.join(parts).encode('utf-8'))
+
+        for start_row, start_col, end_row, end_col in block.merges:
+            self.merges.append(f'<mergeCell ref="{column_letter(start_col)}{start_row}:'
+                               f'{column_letter(end_col)}{end_row}"/>')
+
+    def head(self, xf_ids):
+        """シートのXMLのうち、行データより前の部分"""
+        layout = self.layout
+        cols = []
+        for col, width in sorted(layout.column_widths.items()):
+            style = ''
+            if layout.column_style is not None and col in layout.style_columns:
+                style = f' style="{xf_ids[layout.column_style]}"'
+            cols.append(f'<col min="{col}" max="{col}" width="{width}" customWidth="1"{style}/>')
+        return (
+            f'{XML_DECLARATION}<worksheet xmlns="{SHEET_NS}" xmlns:r="{REL_NS}">'
+            '<sheetPr><outlinePr summaryBelow="1" summaryRight="1"/><pageSetUpPr/></sheetPr>'
+            f'<dimension ref="A1:{COLUMN_LETTERS[LAST_COL]}{self.max_row}"/>'
+            f'<sheetViews><sheetView zoomScale="{layout.zoom_scale}" workbookViewId="0">'
+            '<selection activeCell="A1" sqref="A1"/></sheetView></sheetViews>'
+            '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>'
+            f'<cols>{"".join(cols)}</cols><sheetData>'
+        )
+
+    def tail(self, dxf_ids):
+        """シートのXMLのうち、行データより後の部分（セル結合、条件付き書式）"""
+        parts = ['</sheetData>']
+        if self.merges:
+            parts.append(f'<mergeCells count="{len(self.merges)}">{"".join(self.merges)}</mergeCells>')
+        for priority, (area, formula, style) in enumerate(self.formats, start=1):
+            parts.append(f'<conditionalFormatting sqref="{area}"><cfRule type="expression" '
+                         f'priority="{priority}" dxfId="{dxf_ids[style]}">'
+                         f'<formula>{escape(formula)}</formula></cfRule></conditionalFormatting>')
+        parts.append(PAGE_MARGINS + '</worksheet>')
+        return ''.join(parts)
+
+    def write_to(self, f, xf_ids, dxf_ids):
+        f.write(self.head(xf_ids).encode('utf-8'))
+        self.sheet_data.seek(0)
+        copyfileobj(self.sheet_data, f)
+        f.write(self.tail(dxf_ids).encode('utf-8'))
+
+    def rendered(self, xf_ids, dxf_ids):
+        """シートのXMLを組み立て済みのRenderedSheetにする（別のプロセスから受け渡すため）"""
+        return RenderedSheet.of(self, xf_ids, dxf_ids)
+
+    def close(self):
+        self.sheet_data.close()
+
+
+class XmlFlagSheet:
+    """スパース出力の休日の一覧（非表示シート）"""
+    def __init__(self, title, rows):
+        self.title = title
+        self.state = 'hidden'
+        self.rows = list(rows)
+
+    def write_to(self, f, xf_ids, dxf_ids):
+        rows = []
+        for index, row in enumerate(self.rows, start=1):
+            cells = ''.join(cell_xml(f"{column_letter(col)}{index}", value, 0)
+                            for col, value in enumerate(row, start=1) if value is not None)
+            if cells:
+                rows.append(f'<row r="{index}">{cells}</row>')
+        f.write((f'{XML_DECLARATION}<worksheet xmlns="{SHEET_NS}" xmlns:r="{REL_NS}">'
+                 f'<sheetData>{"".join(rows)}</sheetData>{PAGE_MARGINS}</worksheet>').encode('utf-8'))
+
+    def rendered(self, xf_ids, dxf_ids):
+        return RenderedSheet.of(self, xf_ids, dxf_ids)
+
+    def close(self):
+        pass
+
+
+class RenderedSheet:
+    """
+    XMLを組み立て済みのシート（並列の生成でワーカープロセスが書き出したもの）。
+    スタイルの番号はprecomputed_styles()で決まるため、どのプロセスで組み立てても同じになる。
+    """
+    def __init__(self, title, state, xml):
+        self.title = title
+        self.state = state
+        self.xml = xml
+
+    @classmethod
+    def of(cls, sheet, xf_ids, dxf_ids):
+        buffer = BytesIO()
+        sheet.write_to(buffer, xf_ids, dxf_ids)
+        return cls(sheet.title, sheet.state, buffer.getvalue())
+
+    def write_to(self, f, xf_ids, dxf_ids):
+        f.write(self.xml)
+
+    def close(self):
+        pass
+
+
+class XmlWriter:
+    """
+    シートのXMLを直接書き出すバックエンド（OpenpyxlWriterと同じメソッドを持つ）。
+    行は上から順に一時領域へ書き出し、保存時にZIPへまとめる。
+    """
+    def __init__(self, layout, compress_level=None):
+        self.compress_level = compress_level
+        # 数式の計算結果を書き込む場合は、開いたときにすべて再計算させない
+        self.full_calc_on_load = not layout.cached_values
+        self.stylesheet, self.xf_ids, self.dxf_ids = precomputed_styles()
+        self.sheets = []
+        self.add_sheet(layout)
+
+    def add_sheet(self, layout):
+        """シートを追加し、以降の書き出し先にする"""
+        self.sheet = XmlSheet(layout)
+        self.sheets.append(self.sheet)
+
+    def write_block(self, block):
+        """
+        行のまとまり（シート上部、1か月分の表）を書き出す。
+        """
+        self.sheet.write_block(block, self.xf_ids)
+
+    def add_rendered_sheets(self, sheets):
+        """別のプロセスで組み立て済みのシート（RenderedSheetのリスト）を順に追加"""
+        self.sheets.extend(sheets)
+
+    def write_holiday_flags(self, rows):
+        """スパース出力の休日の一覧（非表示シート）"""
+        self.sheets.append(XmlFlagSheet(self.sheet.layout.flag_sheet_title, rows))
+
+    def add_conditional_formats(self, formats):
+        self.sheet.formats.extend(formats)
+
+    def package_parts(self):
+        """シート以外の固定の部品（ファイル名 -> XML）"""
+        now = datetime.now(tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        count = len(self.sheets)
+        calc = ' fullCalcOnLoad="1"' if self.full_calc_on_load else ''
+        sheet_types = ''.join(
+            f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            for index in range(1, count + 1))
+        sheet_entries = ''.join(
+            f'<sheet name={quoteattr(sheet.title)} sheetId="{index}" state="{sheet.state}" r:id="rId{index}"/>'
+            for index, sheet in enumerate(self.sheets, start=1))
+        sheet_rels = ''.join(
+            f'<Relationship Id="rId{index}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{index}.xml"/>'
+            for index in range(1, count + 1))
+        return {
+            '[Content_Types].xml': (
+                f'{XML_DECLARATION}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '<Override PartName="/xl/workbook.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                f'{sheet_types}'
+                '<Override PartName="/xl/styles.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+                '<Override PartName="/xl/theme/theme1.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.theme+xml"/>'
+                '<Override PartName="/docProps/core.xml" '
+                'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+                '<Override PartName="/docProps/app.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>'
+                '</Types>'),
+            '_rels/.rels': (
+                f'{XML_DECLARATION}<Relationships xmlns="{PACKAGE_REL_NS}">'
+                f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/>'
+                f'<Relationship Id="rId2" Type="{PACKAGE_REL_NS}/metadata/core-properties" '
+                'Target="docProps/core.xml"/>'
+                f'<Relationship Id="rId3" Type="{REL_NS}/extended-properties" Target="docProps/app.xml"/>'
+                '</Relationships>'),
+            'docProps/app.xml': (
+                f'{XML_DECLARATION}<Properties '
+                'xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">'
+                '<Application>Microsoft Excel Compatible / work-scheduler</Application></Properties>'),
+            'docProps/core.xml': (
+                f'{XML_DECLARATION}<cp:coreProperties '
+                'xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+                'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+                'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+                '<dc:creator>work-scheduler</dc:creator>'
+                f'<dcterms:created xsi:type="dcterms:W3CDTF">{now}</dcterms:created>'
+                f'<dcterms:modified xsi:type="dcterms:W3CDTF">{now}</dcterms:modified>'
+                '</cp:coreProperties>'),
+            'xl/workbook.xml': (
+                f'{XML_DECLARATION}<workbook xmlns="{SHEET_NS}" xmlns:r="{REL_NS}">'
+                '<workbookPr/><bookViews><workbookView activeTab="0"/></bookViews>'
+                f'<sheets>{sheet_entries}</sheets><calcPr calcId="124519"{calc}/></workbook>'),
+            'xl/_rels/workbook.xml.rels': (
+                f'{XML_DECLARATION}<Relationships xmlns="{PACKAGE_REL_NS}">{sheet_rels}'
+                f'<Relationship Id="rId{count + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+                f'<Relationship Id="rId{count + 2}" Type="{REL_NS}/theme" Target="theme/theme1.xml"/>'
+                '</Relationships>'),
+            'xl/theme/theme1.xml': theme_xml,
+        }
+
+    def save(self, path):
+        """
+        ZIPに各部品を書き込んで保存。
+        """
+        archive = open_archive(path, self.compress_level)
+        try:
+            for name, xml in self.package_parts().items():
+                archive.writestr(name, xml)
+            archive.writestr('xl/styles.xml', self.stylesheet)
+            for index, sheet in enumerate(self.sheets, start=1):
+                with archive.open(f'xl/worksheets/sheet{index}.xml', 'w', force_zip64=True) as f:
+                    sheet.write_to(f, self.xf_ids, self.dxf_ids)
+        finally:
+            archive.close()
+            self.close()
+
+    def close(self):
+        """一時領域を解放"""
+        for sheet in self.sheets:
+            sheet.close()
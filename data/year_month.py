@@ -0,0 +1,95 @@
+# data/year_month.py
+"""
+年月の計算と月ごとの情報。
+年月は通し番号（年*12+月-1）で扱い、足し引きや範囲を整数の計算だけで行う。
+月ごとの日数、曜日、令和の表記は1度だけ計算して使い回す（画面の選択肢、工程表の生成、休日データの初期化で共通）。
+"""
+from collections import namedtuple
+from datetime import datetime
+from functools import lru_cache
+import calendar
+
+# 曜日（datetime.weekday()の順）
+WEEKDAYS_JP = ('月', '火', '水', '木', '金', '土', '日')
+
+# 令和元年
+REIWA_FIRST_YEAR = 2019
+
+# 月ごとの情報
+# days: 日数、first_weekday: 1日の曜日（月曜が0）、weekday_labels: 各日の曜日（'月'など、1日から順）
+MonthInfo = namedtuple('MonthInfo', ['year', 'month', 'days', 'first_weekday', 'weekday_labels'])
+
+
+def month_index(year, month):
+    """年月を通し番号（年*12+月-1）に変換"""
+    return year * 12 + month - 1
+
+
+def year_month(index):
+    """通し番号を(年, 月)に変換"""
+    return index // 12, index % 12 + 1
+
+
+def date_index(date):
+    """datetime（日は無視）を通し番号に変換"""
+    return month_index(date.year, date.month)
+
+
+def index_date(index):
+    """通し番号をその月の1日のdatetimeに変換"""
+    year, month = year_month(index)
+    return datetime(year, month, 1)
+
+
+def parse_month(text):
+    """'2019/01' 形式の年月を通し番号に変換（形式が違う場合、月が1~12でない場合はValueError）"""
+    year, month = map(int, text.split('/'))
+    if not 1 <= month <= 12:
+        raise ValueError(f"月は1~12で指定してください: {text}")
+    return month_index(year, month)
+
+
+def format_month(index):
+    """通し番号を '2019/01' 形式の年月に変換"""
+    return f"{index // 12}/{index % 12 + 1:02d}"
+
+
+def month_span(start_date, end_date):
+    """開始年月から終了年月までの月数"""
+    return date_index(end_date) - date_index(start_date) + 1
+
+
+def end_of_span(start_date, months):
+    """開始年月からmonthsか月分の終了年月（月初のdatetime）"""
+    return index_date(date_index(start_date) + months - 1)
+
+
+def month_range(start_date, end_date):
+    """開始年月から終了年月までの通し番号のrange"""
+    return range(date_index(start_date), date_index(end_date) + 1)
+
+
+@lru_cache(maxsize=None)
+def month_info(index):
+    """通し番号の月の情報（MonthInfo）"""
+    year, month = year_month(index)
+    first_weekday, days = calendar.monthrange(year, month)
+    labels = tuple(WEEKDAYS_JP[(first_weekday + day) % 7] for day in range(days))
+    return MonthInfo(year, month, days, first_weekday, labels)
+
+
+@lru_cache(maxsize=None)
+def reiwa_title(year, month):
+    """
+    西暦の年月を令和の表記（'令和6年1月'）に変換。
+    令和元年は2019年（'令和1年'と表記する）。
+    """
+    if year < REIWA_FIRST_YEAR:
+        raise ValueError("令和は2019年以降の年です。")
+    return f"令和{year - REIWA_FIRST_YEAR + 1}年{month}月"
+
+
+@lru_cache(maxsize=64)
+def month_options(first_index, last_index):
+    """first_indexからlast_indexまでの年月の選択肢（'2024/01'形式のタプル）"""
+    return tuple(format_month(index) for index in range(first_index, last_index + 1))
@@ -1,15 +1,18 @@
 # main.py
+import multiprocessing
 import tkinter as tk
 from ui.main_ui import MainUI
-from update_checker import perform_update_check
+from update_checker import start_background_update_check
 
 def main():
-    perform_update_check()
-
     root = tk.Tk()
     app = MainUI(root)
+
+    # ウィンドウ表示後にバックグラウンドでアップデートを確認
+    start_background_update_check(root)
     root.mainloop()
 
 if __name__ == "__main__":
+    # 年ごとのシートの並列生成（ワーカープロセス）をexe化した環境でも動かすため
+    multiprocessing.freeze_support()
     main()
-
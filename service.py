@@ -0,0 +1,399 @@
+# service.py
+"""
+工程表を生成するローカルHTTPサービス（GUIなし、標準ライブラリのみ）。
+
+使い方:
+    python service.py --host 127.0.0.1 --port 8080 --workers 4 --max-queue 32 --output-dir service_output
+
+生成はプロセスプール（--workers）で行う。各ワーカーは起動時に休日データ、'xml'バックエンドのスタイル、
+各月の表のテンプレートを読み込んでおき、以降のジョブで使い回す（'openpyxl'バックエンドのスタイルは
+ワークブックごとに登録するため、60か月以下の既定のジョブでは毎回作成する）。
+未知の工場（休日データがない）を指定したジョブは400を返す。
+待ちのジョブが --max-queue を超える場合は 503 を返す。
+
+エンドポイント:
+    POST /jobs                 ジョブを登録（202、ジョブの状態を返す）
+    POST /generate             生成の完了を待ってファイルを返す
+    GET  /jobs/{id}            ジョブの状態
+    GET  /jobs/{id}/download   生成したファイル（完了前は409）
+    GET  /metrics              待ちのジョブ数、処理時間などの統計
+    GET  /health               稼働確認
+
+リクエストの本文はJSON（batch.pyのジョブと同じキー）:
+    {"title": "工事名", "start": "2024/01", "end": "2024/06", "factory": "結城", "sparse": false}
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, urlsplit
+
+from batch import prepare_job, run_job
+from data.holiday_store import available_factories, get_holiday_calendar
+
+# ダウンロードで1回に送る大きさ
+CHUNK_SIZE = 64 * 1024
+
+# リクエストの本文の上限
+MAX_BODY_SIZE = 64 * 1024
+
+# 統計に使う直近のジョブ数
+LATENCY_WINDOW = 1000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# ダウンロードのファイル名に使えない文字
+INVALID_FILENAME_CHARS = '\\/:*?"<>|'
+
+
+class QueueFull(Exception):
+    """
+    待ちのジョブが上限に達している場合に送出。
+    """
+
+
+def warm_worker():
+    """
+    ワーカープロセスの初期化。
+    生成に使うモジュール、全工場の休日データ、'xml'バックエンドのスタイル、各月の表のテンプレートを先に読み込む。
+    テンプレートはshared_template()としてプロセス内に残り、各ジョブの生成で使い回される。
+    """
+    from data.month_template import shared_template
+    from data.xml_writer import precomputed_styles
+    for factory in available_factories():
+        get_holiday_calendar(factory)
+    precomputed_styles()
+    shared_template()
+
+
+def percentile(values, ratio):
+    """値の一覧のratio（0~1）の位置の値"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def latency_summary(values):
+    """処理時間の統計（秒）"""
+    values = list(values)
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': round(statistics.fmean(values), 4),
+        'p50': round(percentile(values, 0.5), 4),
+        'p95': round(percentile(values, 0.95), 4),
+        'max': round(max(values), 4),
+    }
+
+
+class ScheduleService:
+    """
+    生成ジョブの受付、ワーカーへの割り当て、結果と統計の管理。
+    max_jobs: 保持する完了済みのジョブの数（超えたら古いものからファイルごと削除）。
+    """
+    def __init__(self, output_dir='service_output', workers=None, max_queue=32, max_jobs=200,
+                 compress_level=None, cache_dir=None):
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_jobs = max_jobs
+        self.compress_level = compress_level
+        self.cache_dir = cache_dir
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_worker)
+        self.jobs = OrderedDict()
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.counts = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'rejected': 0}
+        self.wait_seconds = deque(maxlen=LATENCY_WINDOW)
+        self.generate_seconds = deque(maxlen=LATENCY_WINDOW)
+        self.total_seconds = deque(maxlen=LATENCY_WINDOW)
+        os.makedirs(output_dir, exist_ok=True)
+
+    def warm_up(self):
+        """全ワーカーを起動して初期化を済ませる（最初のジョブが遅くならないように）"""
+        for future in [self.executor.submit(time.sleep, 0.1) for _ in range(self.workers)]:
+            future.result()
+
+    def submit(self, payload):
+        """
+        ジョブを登録し、ジョブの状態（辞書）を返す。
+        入力エラーはValueError、待ちのジョブが上限に達している場合はQueueFull。
+        """
+        if not isinstance(payload, dict):
+            raise ValueError("ジョブはJSONのオブジェクトで指定してください。")
+        job_id = uuid.uuid4().hex
+        try:
+            title, start_date, end_date, factory, _output_path = prepare_job(payload, self.output_dir)
+        except KeyError as e:
+            raise ValueError(f"{e.args[0]}が指定されていません。")
+        if factory not in available_factories():
+            raise ValueError(f"工場「{factory}」の休日データがありません。")
+        # 'false'などの文字列を真として扱わないよう、JSONの真偽値だけを受け付ける
+        sparse = payload.get('sparse', False)
+        if not isinstance(sparse, bool):
+            raise ValueError("sparseはtrueまたはfalseで指定してください。")
+
+        # 保存先はジョブのIDで決め（工事名に'/'などがあっても出力先の外に書き込まない）、
+        # 工事名からのファイル名はダウンロードの時だけ使う
+        filename = f"{title}_{start_date.strftime('%Y%m')}_{end_date.strftime('%Y%m')}.xlsx"
+        filename = ''.join('_' if char in INVALID_FILENAME_CHARS or char < ' ' else char for char in filename)
+        args = (title, start_date, end_date, factory, os.path.join(self.output_dir, f"{job_id}.xlsx"))
+
+        with self.lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.counts['rejected'] += 1
+                raise QueueFull("待ちのジョブが上限に達しています。")
+            self.pending += 1
+            self.counts['submitted'] += 1
+            job = {
+                'id': job_id,
+                'status': 'queued',
+                'title': args[0],
+                'factory': args[3],
+                'submitted': time.time(),
+                'seconds': None,
+                'error': None,
+                'output_path': args[4],
+                'filename': filename,
+                'done': threading.Event(),
+            }
+            self.jobs[job_id] = job
+        try:
+            future = self.executor.submit(run_job, args, sparse=sparse, compress_level=self.compress_level,
+                                          cache_dir=self.cache_dir)
+        except Exception:
+            # プールが壊れている場合など。登録を取り消し、待ちのジョブの数を戻す
+            with self.lock:
+                self.pending -= 1
+                self.counts['submitted'] -= 1
+                del self.jobs[job_id]
+            raise
+        future.add_done_callback(lambda done: self.finish(job_id, done))
+        return self.public(job)
+
+    def finish(self, job_id, future):
+        """ジョブの完了（ワーカーの結果を反映）"""
+        try:
+            result = future.result()
+        except Exception as e:
+            result = {'ok': False, 'error': f"{type(e).__name__}: {e}", 'seconds': 0.0}
+        with self.lock:
+            self.pending -= 1
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+            total = time.time() - job['submitted']
+            job['status'] = 'done' if result['ok'] else 'failed'
+            job['seconds'] = result['seconds']
+            job['error'] = result['error']
+            self.counts['succeeded' if result['ok'] else 'failed'] += 1
+            self.generate_seconds.append(result['seconds'])
+            self.total_seconds.append(total)
+            self.wait_seconds.append(max(total - result['seconds'], 0.0))
+            job['done'].set()
+            self.evict()
+
+    def evict(self):
+        """保持する上限を超えた完了済みのジョブをファイルごと削除（lockを取得して呼び出す）"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['done'].is_set()]
+        for job_id in finished[:max(len(finished) - self.max_jobs, 0)]:
+            job = self.jobs.pop(job_id)
+            try:
+                os.remove(job['output_path'])
+            except OSError:
+                pass
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    @staticmethod
+    def public(job):
+        """ジョブの状態のうち、レスポンスに含める項目"""
+        return {
+            'id': job['id'],
+            'status': job['status'],
+            'title': job['title'],
+            'factory': job['factory'],
+            'seconds': job['seconds'],
+            'error': job['error'],
+            'filename': job['filename'],
+        }
+
+    def metrics(self):
+        """待ちのジョブ数、処理時間（直近LATENCY_WINDOW件）などの統計"""
+        with self.lock:
+            running = min(self.pending, self.workers)
+            return {
+                'uptime_seconds': round(time.time() - self.started, 1),
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self.pending - running,
+                'running': running,
+                'jobs': dict(self.counts),
+                'latency_seconds': {
+                    'queue_wait': latency_summary(self.wait_seconds),
+                    'generate': latency_summary(self.generate_seconds),
+                    'total': latency_summary(self.total_seconds),
+                },
+            }
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+
+class ServiceHandler(BaseHTTPRequestHandler):
+    """ScheduleServiceのHTTPの窓口"""
+    server_version = 'work-scheduler'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def send_json(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json(status, {'error': message})
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_SIZE:
+            raise ValueError("リクエストが大きすぎます。")
+        try:
+            return json.loads(self.rfile.read(length).decode('utf-8') or 'null')
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"JSONを読み取れません: {e}")
+
+    def send_file(self, job):
+        """生成したファイルを分割して送信"""
+        path = job['output_path']
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error_json(410, "ファイルは削除されています。")
+            return
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            self.send_response(200)
+            self.send_header('Content-Type', XLSX_CONTENT_TYPE)
+            self.send_header('Content-Length', str(size))
+            self.send_header('Content-Disposition',
+                             f"attachment; filename=\"schedule.xlsx\"; "
+                             f"filename*=UTF-8''{quote(job['filename'])}")
+            self.end_headers()
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+
+    def submit(self):
+        """本文のジョブを登録し、ジョブの状態を返す（エラーの場合はレスポンスを送ってNone）"""
+        try:
+            return self.service.submit(self.read_json())
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+        except QueueFull as e:
+            self.send_error_json(503, str(e))
+        return None
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        if path == '/jobs':
+            job = self.submit()
+            if job is not None:
+                self.send_json(202, job)
+        elif path == '/generate':
+            job = self.submit()
+            if job is None:
+                return
+            job = self.service.get(job['id'])
+            job['done'].wait()
+            if job['status'] == 'done':
+                self.send_file(job)
+            else:
+                self.send_error_json(500, job['error'])
+        else:
+            self.send_error_json(404, "見つかりません。")
+
+    def do_GET(self):
+        parts = urlsplit(self.path).path.strip('/').split('/')
+        if parts == ['health']:
+            self.send_json(200, {'status': 'ok'})
+        elif parts == ['metrics']:
+            self.send_json(200, self.service.metrics())
+        elif len(parts) in (2, 3) and parts[0] == 'jobs' and parts[2:] in ([], ['download']):
+            job = self.service.get(parts[1])
+            if job is None:
+                self.send_error_json(404, "ジョブが見つかりません。")
+            elif len(parts) == 2:
+                self.send_json(200, self.service.public(job))
+            elif job['status'] != 'done':
+                self.send_error_json(409, f"ジョブは完了していません（{job['status']}）。")
+            else:
+                self.send_file(job)
+        else:
+            self.send_error_json(404, "見つかりません。")
+
+
+def make_server(service, host='127.0.0.1', port=8080, quiet=False):
+    """ScheduleServiceを公開するHTTPサーバーを作成（port=0で空いているポート）"""
+    server = ThreadingHTTPServer((host, port), ServiceHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.quiet = quiet
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="工程表を生成するHTTPサービスを起動します。")
+    parser.add_argument('--host', default='127.0.0.1', help="待ち受けるアドレス")
+    parser.add_argument('--port', type=int, default=8080, help="待ち受けるポート")
+    parser.add_argument('--workers', type=int, default=None, help="生成するワーカー数（省略時はCPU数）")
+    parser.add_argument('--max-queue', type=int, default=32, help="待ちのジョブの上限（超えたら503）")
+    parser.add_argument('--max-jobs', type=int, default=200, help="保持する完了済みのジョブの数")
+    parser.add_argument('--output-dir', default='service_output', help="生成したファイルの保存先")
+    parser.add_argument('--compress-level', type=int, choices=range(10), default=None,
+                        help="保存時のZIP圧縮レベル（0は無圧縮で最も速い）")
+    parser.add_argument('--cache-dir', help="生成結果のキャッシュの保存先（同じ入力の工程表はコピーする）")
+    parser.add_argument('--quiet', action='store_true', help="リクエストごとのログを表示しない")
+    args = parser.parse_args(argv)
+
+    service = ScheduleService(args.output_dir, args.workers, args.max_queue, args.max_jobs,
+                              args.compress_level, args.cache_dir)
+    service.warm_up()
+    server = make_server(service, args.host, args.port, args.quiet)
+    print(f"http://{args.host}:{server.server_address[1]} で待ち受けています（ワーカー {service.workers}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,23 @@
 # ui/main_ui.py
 import tkinter as tk
-from tkinter import ttk, messagebox
-from data.excel_generator import ExcelGenerator
-from utils.path_helper import resource_path
+from tkinter import ttk, messagebox, filedialog
+from data.factories import FACTORIES_MAPPING
+from data.year_month import month_index, year_month, index_date, parse_month, format_month, month_options
+from utils.path_helper import get_output_path
+from utils.file_helper import open_file_async
 from datetime import datetime, timedelta
-import os
+import queue
+import threading
 
+# 生成中の進捗をTkのイベントループで受け取る間隔（ミリ秒）
+POLL_INTERVAL_MS = 100
 
-def get_output_path(title, start_date, end_date):
-    output_dir = resource_path('output')
-    os.makedirs(output_dir, exist_ok=True)
-    filename = f"{title}_{start_date.strftime('%Y%m')}_{end_date.strftime('%Y%m')}.xlsx"
-    full_path = os.path.join(output_dir, filename)
-    return full_path
 
 class MainUI:
     def __init__(self, root):
         self.root = root
         self.root.title("製造工程表自動生成ツール")
-        self.root.geometry("500x400")
+        self.root.geometry("500x650")
 
         # タイトル入力欄
         title_frame = tk.Frame(root)
@@ -50,27 +49,54 @@ class MainUI:
         self.end_date_cb = ttk.Combobox(end_frame, textvariable=self.end_date_var, values=[], width=10, state='readonly')
         self.end_date_cb.pack(side=tk.LEFT)
 
+        # 長い期間は年ごとのシートに分ける（残り数量はシートをまたいで引き継ぐ）
+        self.split_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(selection_frame, text="年ごとにシートを分ける", variable=self.split_var).pack(pady=5)
+
         # 工場選択
         factory_frame = tk.Frame(root)
         factory_frame.pack(pady=10)
         tk.Label(factory_frame, text="工場選択:").pack(side=tk.LEFT, padx=5)
         self.factory_var = tk.StringVar()
-        self.factories_mapping = {
-            '結城': 'kihon',
-            '熊谷': 'kihon',
-            '静岡': 'kihon',
-            '京都': 'kihon',
-            '千葉': 'chiba',
-            '富山': 'kihon'
-        }
+        self.factories_mapping = dict(FACTORIES_MAPPING)
         factories_display = list(self.factories_mapping.keys())
         self.factory_combo = ttk.Combobox(factory_frame, textvariable=self.factory_var, values=factories_display, width=15, state="readonly")
         self.factory_combo.pack(side=tk.LEFT)
         self.factory_combo.set(factories_display[0])
 
-        # 生成ボタン
-        generate_button = ttk.Button(root, text="工程表生成", command=self.generate_schedule)
-        generate_button.pack(pady=20)
+        # 複数の工場の工程表を1つのファイルにまとめる（工場ごとのシート）
+        combine_frame = tk.Frame(root)
+        combine_frame.pack(pady=5)
+        self.combine_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(combine_frame, text="複数の工場を1つのファイルにまとめる（工場ごとのシート）",
+                       variable=self.combine_var, command=self.update_factory_selection).pack()
+        self.factory_listbox = tk.Listbox(combine_frame, selectmode=tk.MULTIPLE, height=len(factories_display),
+                                          width=20, exportselection=False)
+        for name in factories_display:
+            self.factory_listbox.insert(tk.END, name)
+        self.factory_listbox.pack(pady=5)
+        self.update_factory_selection()
+
+        # 生成ボタン、キャンセルボタン
+        button_frame = tk.Frame(root)
+        button_frame.pack(pady=20)
+        self.generate_button = ttk.Button(button_frame, text="工程表生成", command=self.generate_schedule)
+        self.generate_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button = ttk.Button(button_frame, text="キャンセル", command=self.cancel_generation, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        self.extend_button = ttk.Button(button_frame, text="既存の工程表を延長", command=self.extend_schedule)
+        self.extend_button.pack(side=tk.LEFT, padx=5)
+
+        # 進捗表示
+        self.progress_var = tk.DoubleVar()
+        self.progress_bar = ttk.Progressbar(root, variable=self.progress_var, maximum=1, length=300)
+        self.progress_bar.pack()
+        self.status_var = tk.StringVar()
+        tk.Label(root, textvariable=self.status_var).pack(pady=5)
+
+        # 生成処理の状態（別スレッドで実行）
+        self.cancel_event = None
+        self.generation_queue = None
 
         # 初期値の設定
         self.set_initial_dates()
@@ -80,12 +106,7 @@ class MainUI:
         current_year = datetime.now().year
         start_year = current_year - 5
         end_year = current_year + 20
-        months = range(1, 13)
-        options = []
-        for year in range(start_year, end_year + 1):
-            for month in months:
-                options.append(f"{year}/{month:02d}")
-        return options
+        return month_options(month_index(start_year, 1), month_index(end_year, 12))
 
     def set_initial_dates(self):
         """開始年月と終了年月の初期値を設定"""
@@ -101,29 +122,18 @@ class MainUI:
 
     def calculate_end_date(self, year, month, delta_months=6):
         """指定された年と月からdelta_months後の年月を計算"""
-        total_month = year * 12 + month + delta_months
-        new_year = total_month // 12
-        new_month = total_month % 12
-        if new_month == 0:
-            new_month = 12
-            new_year -= 1
-        return f"{new_year}/{new_month:02d}"
+        return format_month(month_index(year, month) + delta_months)
 
     def generate_end_date_options(self, start_year, start_month):
-        """開始年月から半年後から20年後までの終了年月のオプションを生成"""
-        options = []
-        # 開始年月から20年後までの各月を追加
-        for delta in range(6, 12 * 20 + 1):
-            end_date = self.calculate_end_date(start_year, start_month, delta)
-            if end_date not in options:
-                options.append(end_date)
-        return options
+        """開始年月から半年後から20年後までの終了年月のオプションを生成（同じ開始年月では使い回す）"""
+        start = month_index(start_year, start_month)
+        return month_options(start + 6, start + 12 * 20)
 
     def update_end_date_options(self, event=None):
         """開始年月が変更されたときに終了年月のオプションを更新し、初期値を設定"""
         selected = self.start_date_var.get()
         if selected:
-            year, month = map(int, selected.split('/'))
+            year, month = year_month(parse_month(selected))
             # 新しい終了年月のオプションを生成
             new_end_options = self.generate_end_date_options(year, month)
             self.end_date_cb['values'] = new_end_options
@@ -135,6 +145,23 @@ class MainUI:
             self.end_date_var.set(new_end_date)
             self.end_date_cb.current(0)
 
+    def update_factory_selection(self):
+        """まとめる場合は一覧から複数選択、まとめない場合はコンボボックスから1つ選択"""
+        if self.combine_var.get():
+            self.factory_combo.config(state=tk.DISABLED)
+            self.factory_listbox.config(state=tk.NORMAL)
+        else:
+            self.factory_combo.config(state="readonly")
+            self.factory_listbox.config(state=tk.DISABLED)
+
+    def selected_factories(self):
+        """選択された工場の(表示名, 識別子)のリスト"""
+        if self.combine_var.get():
+            names = [self.factory_listbox.get(index) for index in self.factory_listbox.curselection()]
+        else:
+            names = [self.factory_var.get()]
+        return [(name, self.factories_mapping.get(name)) for name in names]
+
     def generate_schedule(self):
         title = self.title_var.get().strip()
         if not title:
@@ -146,10 +173,8 @@ class MainUI:
             end_date_str = self.end_date_var.get()
 
             # 日付のパース
-            start_year, start_month = map(int, start_date_str.split('/'))
-            end_year, end_month = map(int, end_date_str.split('/'))
-            start_date = datetime(start_year, start_month, 1)
-            end_date = datetime(end_year, end_month, 1)
+            start_date = index_date(parse_month(start_date_str))
+            end_date = index_date(parse_month(end_date_str))
 
             if start_date > end_date:
                 messagebox.showerror("入力エラー", "開始年月が終了年月より後になっています。")
@@ -158,17 +183,166 @@ class MainUI:
             messagebox.showerror("入力エラー", "有効な年月を選択してください。")
             return
         
-        factory_display = self.factory_var.get()
-        factory_internal = self.factories_mapping.get(factory_display)
+        factories = self.selected_factories()
+        if not factories:
+            messagebox.showerror("選択エラー", "工場を選択してください。")
+            return
+        if not all(factory_internal for _name, factory_internal in factories):
+            messagebox.showerror("選択エラー", "選択された工場の識別子が見つかりません。")
+            return
+
+        split = 'year' if self.split_var.get() else None
+        if split and self.combine_var.get():
+            messagebox.showerror("選択エラー", "年ごとにシートを分ける場合は工場を1つ選択してください。")
+            return
+
+        if self.combine_var.get():
+            output_path = get_output_path(f"{title}_工場比較", start_date, end_date)
+        else:
+            output_path = get_output_path(title, start_date, end_date)
+        self.start_generation(self.run_generation, (title, start_date, end_date, factories, output_path, split))
 
-        if not factory_internal:
+    def extend_schedule(self):
+        """生成済みの工程表を選び、終了年月まで月の表を追加（入力済みの内容はそのまま）"""
+        if self.combine_var.get():
+            messagebox.showerror("選択エラー", "延長する場合は工場を1つ選択してください。")
+            return
+        factory = self.factories_mapping.get(self.factory_var.get())
+        if not factory:
             messagebox.showerror("選択エラー", "選択された工場の識別子が見つかりません。")
             return
+        try:
+            end_date = index_date(parse_month(self.end_date_var.get()))
+        except ValueError:
+            messagebox.showerror("入力エラー", "有効な年月を選択してください。")
+            return
+
+        # 追加する月の休日は選択中の工場で決まるため、ファイルの工場と同じか確認してもらう
+        factory_name = self.factory_var.get()
+        if not messagebox.askokcancel(
+                "工程表の延長",
+                f"「{factory_name}」で生成した工程表を選択してください。\n"
+                f"終了年月（{self.end_date_var.get()}）まで月の表を追加し、選択したファイルを上書きします。\n"
+                "工場ごとのシートや年ごとのシートがある工程表は延長できません。"):
+            return
+        source_path = filedialog.askopenfilename(
+            title=f"延長する工程表を選択（{factory_name}）", filetypes=[("Excelファイル", "*.xlsx")])
+        if not source_path:
+            return
+        self.start_generation(self.run_extension, (source_path, end_date, factory))
 
-        output_path = get_output_path(title, start_date, end_date)
+    def start_generation(self, target, args):
+        """
+        工程表の生成（または延長）を別スレッドで開始し、画面を固まらせずに進捗を表示。
+        targetはargsの後ろにcancel_eventと結果のキューを受け取る。
+        """
+        self.cancel_event = threading.Event()
+        self.generation_queue = queue.Queue()
+        self.generate_button.config(state=tk.DISABLED)
+        self.extend_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress_var.set(0)
+        self.status_var.set("生成中...")
+
+        thread = threading.Thread(
+            target=target,
+            args=tuple(args) + (self.cancel_event, self.generation_queue),
+            name="generate-schedule",
+            daemon=True
+        )
+        thread.start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_generation)
+
+    @staticmethod
+    def run_generation(title, start_date, end_date, factories, output_path, split, cancel_event, results):
+        """
+        別スレッドで工程表を生成。
+        factoriesは(表示名, 識別子)のリスト。複数の場合は工場ごとのシートにまとめて1つのファイルにする。
+        split: 'year'の場合は年ごとのシートに分ける（ExcelGeneratorのsplit）。
+        Tkには触れず、進捗と結果はすべてresultsキューで画面側に送る。
+        """
+        try:
+            # openpyxlの読み込みに時間がかかるため、起動時ではなく初回の生成時に読み込む
+            from data.excel_generator import ExcelGenerator, GenerationCancelled
+            from data.workbook_cache import WorkbookCache
+            # 同じ工程表を作り直す場合は、前回の生成結果をコピーする（作成日だけ更新）
+            # 年ごとのシートは順に組み立てる（ワーカープロセスの起動の方が組み立てより時間がかかる）
+            generator = ExcelGenerator(open_file=False, cache=WorkbookCache(), split=split, workers=1)
+            progress = lambda done, total: results.put(('progress', done, total))
+            if len(factories) == 1:
+                generator.generate_excel(
+                    title, start_date, end_date, factories[0][1], output_path,
+                    progress=progress,
+                    cancel_event=cancel_event
+                )
+            else:
+                schedules = [(title, start_date, end_date, factory, name) for name, factory in factories]
+                generator.generate_workbook(schedules, output_path, progress=progress, cancel_event=cancel_event)
+            results.put(('done', output_path))
+        except GenerationCancelled:
+            results.put(('cancelled', None))
+        except Exception as e:
+            results.put(('error', e))
 
+    @staticmethod
+    def run_extension(source_path, end_date, factory, cancel_event, results):
+        """別スレッドで生成済みの工程表を延長（元のファイルを置き換える）"""
         try:
-            generator = ExcelGenerator()
-            generator.generate_excel(title, start_date, end_date, factory_internal, output_path)
+            from data.excel_generator import ExcelGenerator, GenerationCancelled
+            generator = ExcelGenerator(open_file=False)
+            generator.extend_excel(
+                source_path, end_date, factory,
+                progress=lambda done, total: results.put(('progress', done, total)),
+                cancel_event=cancel_event
+            )
+            results.put(('done', source_path))
+        except GenerationCancelled:
+            results.put(('cancelled', None))
         except Exception as e:
-            messagebox.showerror("エラー", f"工程表の生成中にエラーが発生しました。\n{e}")
+            results.put(('error', e))
+
+    def poll_generation(self):
+        """生成スレッドからの進捗と結果を受け取る"""
+        while True:
+            try:
+                message = self.generation_queue.get_nowait()
+            except queue.Empty:
+                self.root.after(POLL_INTERVAL_MS, self.poll_generation)
+                return
+
+            kind = message[0]
+            if kind == 'progress':
+                done, total = message[1], message[2]
+                self.progress_var.set(done / total)
+                if done < total:
+                    self.status_var.set(f"生成中... {done}/{total}か月")
+                else:
+                    self.status_var.set("保存中...")
+                continue
+
+            self.finish_generation()
+            if kind == 'done':
+                self.progress_var.set(1)
+                self.status_var.set("生成しました。")
+                open_file_async(message[1])
+            elif kind == 'cancelled':
+                self.progress_var.set(0)
+                self.status_var.set("キャンセルしました。")
+            else:
+                self.status_var.set("")
+                messagebox.showerror("エラー", f"工程表の生成中にエラーが発生しました。\n{message[1]}")
+            return
+
+    def finish_generation(self):
+        self.cancel_event = None
+        self.generation_queue = None
+        self.generate_button.config(state=tk.NORMAL)
+        self.extend_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
+
+    def cancel_generation(self):
+        """生成中の工程表をキャンセル（月の区切りで中断し、ファイルは残さない）"""
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+            self.cancel_button.config(state=tk.DISABLED)
+            self.status_var.set("キャンセル中...")
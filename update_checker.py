@@ -1,11 +1,15 @@
 # ui/update_checker.py
 
-import requests
-from packaging import version
 import tkinter as tk
 from tkinter import messagebox
 import webbrowser
+import threading
+import queue
+import json
+import os
 import sys
+import time
+from utils.path_helper import user_cache_dir
 
 # アプリケーションの現在のバージョン
 CURRENT_VERSION = "1.3.0"
@@ -13,39 +17,144 @@ CURRENT_VERSION = "1.3.0"
 # GitHubリポジトリ情報
 GITHUB_USER = "ka-tamaki"
 GITHUB_REPO = "work-scheduler"
+# 環境変数で確認先を差し替え可能（社内ミラーや動作確認用のローカルサーバー）
+RELEASES_URL = os.environ.get(
+    'WORK_SCHEDULER_UPDATE_URL',
+    f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/releases/latest"
+)
 
-def get_latest_release():
-    url = f"https://api.github.com/repos/{GITHUB_USER}/{GITHUB_REPO}/releases/latest"
+# 通信のタイムアウト（秒）
+REQUEST_TIMEOUT = 5
+
+# 前回の確認からこの時間（秒）が経つまではネットワークに接続しない（環境変数で変更可能）
+CHECK_INTERVAL_ENV = 'WORK_SCHEDULER_UPDATE_INTERVAL'
+DEFAULT_CHECK_INTERVAL = 24 * 60 * 60
+
+# バックグラウンドの確認結果をTkのイベントループで受け取る間隔（ミリ秒）
+POLL_INTERVAL_MS = 200
+
+def get_cache_path():
+    """前回の確認結果を保存するファイルのパス"""
+    return user_cache_dir('update_check.json')
+
+def get_check_interval():
+    """確認の間隔（秒）。環境変数が数値でない場合は既定の間隔を使う"""
+    value = os.environ.get(CHECK_INTERVAL_ENV)
+    if not value:
+        return DEFAULT_CHECK_INTERVAL
+    try:
+        return int(value)
+    except ValueError:
+        print(f"{CHECK_INTERVAL_ENV}の値が数値ではないため、既定の間隔を使います: {value}")
+        return DEFAULT_CHECK_INTERVAL
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache_path, cache):
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"アップデート確認結果の保存に失敗しました: {e}")
+
+def get_latest_release(url=RELEASES_URL, cache_path=None, interval=None, timeout=REQUEST_TIMEOUT):
+    """
+    最新リリースの情報を取得。
+    前回の確認からinterval秒以内ならキャッシュを返し、ネットワークには接続しない。
+    intervalを省略した場合はget_check_interval()の間隔。
+    接続する場合はETag（If-None-Match）を送り、変更がなければ（304）キャッシュを使う。
+    通信に失敗した場合もキャッシュを返し、次の確認はinterval秒後まで行わない。
+    """
+    if cache_path is None:
+        cache_path = get_cache_path()
+    if interval is None:
+        interval = get_check_interval()
+    cache = load_cache(cache_path)
+    now = time.time()
+    if now - cache.get('checked_at', 0) < interval:
+        return cache.get('release')
+
+    # 起動を遅らせないよう、実際に接続する時だけ読み込む
+    import requests
+
+    headers = {}
+    if cache.get('etag') and cache.get('release'):
+        headers['If-None-Match'] = cache['etag']
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code != 304:
+            response.raise_for_status()
+            release = response.json()
+            cache['release'] = {key: release.get(key) for key in ('tag_name', 'html_url')}
+            cache['etag'] = response.headers.get('ETag')
+    except (requests.RequestException, ValueError) as e:
         print(f"アップデートチェック中にエラーが発生しました: {e}")
-        return None
+    cache['checked_at'] = now
+    save_cache(cache_path, cache)
+    return cache.get('release')
 
-def check_for_update():
-    latest_release = get_latest_release()
-    if latest_release:
+def check_for_update(**kwargs):
+    from packaging import version
+
+    latest_release = get_latest_release(**kwargs)
+    if latest_release and latest_release.get('tag_name'):
         latest_version = latest_release['tag_name'].lstrip('v')  # タグにvが含まれている場合
         if version.parse(latest_version) > version.parse(CURRENT_VERSION):
             return latest_release['html_url'], latest_version
     return None, None
 
-def notify_user(download_url, latest_version):
-    root = tk.Tk()
-    root.withdraw()  # メインウィンドウを非表示にする
+def notify_user(download_url, latest_version, parent=None):
+    root = None
+    if parent is None:
+        root = tk.Tk()
+        root.withdraw()  # メインウィンドウを非表示にする
     response = messagebox.askyesno(
         "アップデートのお知らせ",
-        f"新しいバージョン {latest_version} が利用可能です。\n\nアップデートしますか？"
+        f"新しいバージョン {latest_version} が利用可能です。\n\nアップデートしますか？",
+        parent=parent
     )
     if response:
         webbrowser.open(download_url)
-    root.destroy()
+    if root is not None:
+        root.destroy()
+
+def start_background_update_check(root, **kwargs):
+    """
+    アップデート確認を別スレッドで実行し、結果をTkのイベントループで受け取って通知する。
+    メインウィンドウの表示後に呼び出す。kwargsはget_latest_releaseに渡す。
+    """
+    results = queue.Queue()
+
+    def worker():
+        try:
+            results.put(check_for_update(**kwargs))
+        except Exception as e:
+            print(f"アップデートチェック中にエラーが発生しました: {e}")
+            results.put((None, None))
+
+    def poll():
+        try:
+            download_url, latest_version = results.get_nowait()
+        except queue.Empty:
+            root.after(POLL_INTERVAL_MS, poll)
+            return
+        if download_url:
+            notify_user(download_url, latest_version, parent=root)
+
+    thread = threading.Thread(target=worker, name="update-check", daemon=True)
+    thread.start()
+    root.after(POLL_INTERVAL_MS, poll)
+    return thread
 
 def perform_update_check():
     download_url, latest_version = check_for_update()
     if download_url:
         notify_user(download_url, latest_version)
-    
+
     print("perform_update_check実行")
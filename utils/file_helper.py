@@ -0,0 +1,76 @@
+# utils/file_helper.py
+from contextlib import contextmanager
+import os
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+
+
+def current_umask():
+    """プロセスのumask（取得するには一度設定し直す必要がある）"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# 起動時のumask（生成の途中でumaskを設定し直すと、他のスレッドが作るファイルに影響するため1度だけ取得）
+_UMASK = current_umask()
+
+
+def output_mode(output_path):
+    """
+    出力先のファイルの権限。
+    既存のファイルを置き換える場合はその権限、新規の場合は通常の作成と同じ権限（0o666からumaskを除く）。
+    """
+    try:
+        return stat.S_IMODE(os.stat(output_path).st_mode)
+    except FileNotFoundError:
+        return 0o666 & ~_UMASK
+
+
+@contextmanager
+def atomic_output(output_path):
+    """
+    出力先と同じフォルダの一時ファイルのパスを渡し、with文を抜けたら出力先に置き換える。
+    途中で失敗した場合は一時ファイルを削除し、既存の出力先のファイルはそのまま残す。
+    一時ファイルは所有者だけが読み書きできる権限で作成されるため、置き換える前にoutput_mode()の権限にする。
+    """
+    directory, filename = os.path.split(os.path.abspath(output_path))
+    fd, temp_path = tempfile.mkstemp(prefix=f".~{filename}.", suffix='.tmp', dir=directory)
+    os.close(fd)
+    try:
+        yield temp_path
+        os.chmod(temp_path, output_mode(output_path))
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def open_file(path):
+    """OSの既定のアプリケーションでファイルを開く"""
+    if sys.platform == 'win32':
+        os.startfile(path)
+    elif sys.platform == 'darwin':
+        subprocess.Popen(['open', path])
+    else:
+        subprocess.Popen(['xdg-open', path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def open_file_async(path):
+    """
+    別スレッドでファイルを開く（Excelの起動を待たずに戻る）。
+    開けなかった場合はメッセージを出力するだけで、例外は送出しない。
+    """
+    def worker():
+        try:
+            open_file(path)
+        except OSError as e:
+            print(f"ファイルを開けませんでした: {path}: {e}")
+
+    thread = threading.Thread(target=worker, name="open-file", daemon=True)
+    thread.start()
+    return thread
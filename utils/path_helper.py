@@ -11,3 +11,17 @@ def resource_path(relative_path):
         # 通常の実行の場合
         base_path = os.path.abspath(".")
     return os.path.join(base_path, relative_path)
+
+def user_cache_dir(*parts):
+    """ユーザーごとのキャッシュの保存先（WindowsはLOCALAPPDATA、それ以外は~/.cache）のwork-scheduler配下のパス"""
+    base_dir = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base_dir, 'work-scheduler', *parts)
+
+def get_output_path(title, start_date, end_date, output_dir=None):
+    """出力するexcelのパスを取得（例: '工事名_202401_202406.xlsx'）"""
+    if output_dir is None:
+        output_dir = resource_path('output')
+    os.makedirs(output_dir, exist_ok=True)
+    filename = f"{title}_{start_date.strftime('%Y%m')}_{end_date.strftime('%Y%m')}.xlsx"
+    full_path = os.path.join(output_dir, filename)
+    return full_path